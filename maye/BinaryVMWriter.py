@@ -0,0 +1,277 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import os
+import struct
+import sys
+import typing
+from VMWriter import VMWriter
+
+
+# A command is a tuple of its name and arguments, e.g. ("push", "local", 2),
+# ("add",), ("label", "WHILE_EXP0") or ("call", "Math.multiply", 2).
+Command = typing.Tuple[typing.Union[str, int], ...]
+
+MAGIC = b"JVMB"
+VERSION = 1
+
+# Every instruction is an opcode byte, a segment byte and a 16 bit operand:
+# the index for push and pop, or a string table entry for label, goto,
+# if-goto, call and function. call and function are followed by a second 16
+# bit operand holding the argument or local count.
+INSTRUCTION = struct.Struct("<BBH")
+COUNT = struct.Struct("<H")
+SECTION = struct.Struct("<4sBHI")
+
+OPCODES = [
+    "push", "pop", "add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not",
+    "shiftleft", "shiftright", "label", "goto", "if-goto", "call", "function",
+    "return"]
+SEGMENTS = [
+    "constant", "argument", "local", "static", "this", "that", "pointer",
+    "temp"]
+OPCODE_OF = {name: code for code, name in enumerate(OPCODES)}
+SEGMENT_OF = {name: code for code, name in enumerate(SEGMENTS)}
+PUSH, POP = OPCODE_OF["push"], OPCODE_OF["pop"]
+LABEL, GOTO, IF_GOTO = OPCODE_OF["label"], OPCODE_OF["goto"], OPCODE_OF["if-goto"]
+CALL, FUNCTION = OPCODE_OF["call"], OPCODE_OF["function"]
+
+
+class BinaryVMWriter(VMWriter):
+    """
+    Writes VM commands in a compact binary encoding instead of text.
+
+    Each flush writes one self-contained section: a header with the magic
+    b"JVMB", the format version, the number of strings and the number of
+    instructions, then the string table (16 bit length and UTF-8 bytes per
+    string) and the instructions. Label and function names are interned, so
+    each is stored once per section however often it is used.
+    """
+
+    def __init__(self, output_stream: typing.BinaryIO,
+                 buffer_size: typing.Optional[int] = None) -> None:
+        """Prepares a binary stream for writing VM commands.
+
+        Args:
+            output_stream (typing.BinaryIO): any object with a write(bytes)
+            method.
+            buffer_size (typing.Optional[int]): the number of commands after
+            which a section is flushed, or None to only flush on demand.
+        """
+        super().__init__(output_stream, buffer_size)
+        self.strings = {}
+
+    def intern(self, string: str) -> int:
+        """
+        Args:
+            string (str): a label or function name.
+
+        Returns:
+            int: the index of the string in the current section's table.
+        """
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def flush(self) -> None:
+        """Writes all buffered commands to the output stream as a section."""
+        if not self.buffer:
+            return
+        table = [string.encode() for string in self.strings]
+        section = [SECTION.pack(MAGIC, VERSION, len(table), len(self.buffer))]
+        for string in table:
+            section.append(COUNT.pack(len(string)))
+            section.append(string)
+        section.extend(self.buffer)
+        self.o.write(b"".join(section))
+        self.buffer.clear()
+        self.strings = {}
+
+    def write_push(self, segment: str, index: int) -> None:
+        """Writes a VM push command.
+
+        Args:
+            segment (str): the segment to push from.
+            index (int): the index to push from.
+        """
+        self.emit(INSTRUCTION.pack(PUSH, SEGMENT_OF[segment], index))
+
+    def write_pop(self, segment: str, index: int) -> None:
+        """Writes a VM pop command.
+
+        Args:
+            segment (str): the segment to pop to.
+            index (int): the index to pop to.
+        """
+        self.emit(INSTRUCTION.pack(POP, SEGMENT_OF[segment], index))
+
+    def write_arithmetic(self, command: str) -> None:
+        """Writes a VM arithmetic command.
+
+        Args:
+            command (str): the command to write, can be "ADD", "SUB", "NEG",
+            "EQ", "GT", "LT", "AND", "OR", "NOT", "SHIFTLEFT", "SHIFTRIGHT".
+        """
+        self.emit(INSTRUCTION.pack(OPCODE_OF[command.lower()], 0, 0))
+
+    def write_label(self, label: str) -> None:
+        """Writes a VM label command.
+
+        Args:
+            label (str): the label to write.
+        """
+        self.emit(INSTRUCTION.pack(LABEL, 0, self.intern(label)))
+
+    def write_goto(self, label: str) -> None:
+        """Writes a VM goto command.
+
+        Args:
+            label (str): the label to go to.
+        """
+        self.emit(INSTRUCTION.pack(GOTO, 0, self.intern(label)))
+
+    def write_if(self, label: str) -> None:
+        """Writes a VM if-goto command.
+
+        Args:
+            label (str): the label to go to.
+        """
+        self.emit(INSTRUCTION.pack(IF_GOTO, 0, self.intern(label)))
+
+    def write_call(self, name: str, n_args: int) -> None:
+        """Writes a VM call command.
+
+        Args:
+            name (str): the name of the function to call.
+            n_args (int): the number of arguments the function receives.
+        """
+        self.emit(INSTRUCTION.pack(CALL, 0, self.intern(name))
+                  + COUNT.pack(n_args))
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        """Writes a VM function command.
+
+        Args:
+            name (str): the name of the function.
+            n_locals (int): the number of local variables the function uses.
+        """
+        self.emit(INSTRUCTION.pack(FUNCTION, 0, self.intern(name))
+                  + COUNT.pack(n_locals))
+
+    def write_return(self) -> None:
+        """Writes a VM return command."""
+        self.emit(INSTRUCTION.pack(OPCODE_OF["return"], 0, 0))
+
+
+def load(data: bytes) -> typing.List[Command]:
+    """Decodes binary VM code.
+
+    Args:
+        data (bytes): the contents of a binary VM file, one or more sections.
+
+    Returns:
+        typing.List[Command]: the commands, in order.
+    """
+    commands = []
+    offset = 0
+    while offset < len(data):
+        magic, version, n_strings, n_instructions = \
+            SECTION.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a binary VM section at offset " + str(offset))
+        offset += SECTION.size
+        strings = []
+        for _ in range(n_strings):
+            length, = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            strings.append(data[offset:offset + length].decode())
+            offset += length
+        for _ in range(n_instructions):
+            opcode, segment, operand = INSTRUCTION.unpack_from(data, offset)
+            offset += INSTRUCTION.size
+            name = OPCODES[opcode]
+            if opcode == PUSH or opcode == POP:
+                commands.append((name, SEGMENTS[segment], operand))
+            elif opcode == CALL or opcode == FUNCTION:
+                count, = COUNT.unpack_from(data, offset)
+                offset += COUNT.size
+                commands.append((name, strings[operand], count))
+            elif opcode == LABEL or opcode == GOTO or opcode == IF_GOTO:
+                commands.append((name, strings[operand]))
+            else:
+                commands.append((name,))
+    return commands
+
+
+def parse(text: str) -> typing.List[Command]:
+    """Parses textual VM code.
+
+    Args:
+        text (str): VM code, as written by VMWriter.
+
+    Returns:
+        typing.List[Command]: the commands, in order.
+    """
+    commands = []
+    for line in text.splitlines():
+        line = line.split("//", 1)[0].split()
+        if not line:
+            continue
+        if line[0] in ("push", "pop", "call", "function"):
+            commands.append((line[0], line[1], int(line[2])))
+        else:
+            commands.append(tuple(line))
+    return commands
+
+
+def replay(commands: typing.Iterable[Command], writer: VMWriter) -> None:
+    """Writes commands through any writer, e.g. to convert between formats.
+
+    Args:
+        commands (typing.Iterable[Command]): the commands to write.
+        writer (VMWriter): the writer to write them with. It is flushed.
+    """
+    for command in commands:
+        name = command[0]
+        if name == "push":
+            writer.write_push(command[1], command[2])
+        elif name == "pop":
+            writer.write_pop(command[1], command[2])
+        elif name == "label":
+            writer.write_label(command[1])
+        elif name == "goto":
+            writer.write_goto(command[1])
+        elif name == "if-goto":
+            writer.write_if(command[1])
+        elif name == "call":
+            writer.write_call(command[1], command[2])
+        elif name == "function":
+            writer.write_function(command[1], command[2])
+        elif name == "return":
+            writer.write_return()
+        else:
+            writer.write_arithmetic(name)
+    writer.flush()
+
+
+if "__main__" == __name__:
+    # Converts a .vmb file to a .vm file next to it, or the other way around.
+    if not len(sys.argv) == 2:
+        sys.exit("Invalid usage, please use: BinaryVMWriter <.vm or .vmb file>")
+    input_path = os.path.abspath(sys.argv[1])
+    filename, extension = os.path.splitext(input_path)
+    if extension.lower() == ".vmb":
+        with open(input_path, 'rb') as input_file:
+            commands = load(input_file.read())
+        with open(filename + ".vm", 'w') as output_file:
+            replay(commands, VMWriter(output_file))
+    else:
+        with open(input_path, 'r') as input_file:
+            commands = parse(input_file.read())
+        with open(filename + ".vmb", 'wb') as output_file:
+            replay(commands, BinaryVMWriter(output_file))
@@ -0,0 +1,153 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import typing
+
+
+class BuildCache:
+    """Remembers the output compiled from every source, keyed by a hash of
+    the source and of the compiler itself, so that unchanged files are not
+    compiled again.
+
+    The cache directory holds a manifest and one blob per key. A source whose
+    size and modification time match the manifest, and whose output is still
+    the one the cache wrote, is skipped after two stat calls. Any other source
+    is hashed: a known hash restores its output from the blob, an unknown one
+    has to be compiled and is then stored.
+    """
+
+    directory_name = ".jackcache"
+    manifest_name = "manifest.json"
+
+    def __init__(self, directory: str,
+                 options: typing.Optional[typing.Dict[str, typing.Any]] = None
+                 ) -> None:
+        """Opens (or creates) a cache directory.
+
+        Args:
+            directory (str): the directory holding the cache.
+            options (typing.Optional[typing.Dict[str, typing.Any]]): the
+            options the files are compiled with. Outputs compiled with other
+            options are never reused.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, self.manifest_name)
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                self.manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.compiler = hashlib.sha256((
+            self.compiler_version() + json.dumps(options or {}, sort_keys=True)
+        ).encode()).hexdigest()
+        # The keys of the sources restore() could not bring up to date, by
+        # output path like the manifest, as a source may have many outputs.
+        self.keys = {}
+
+    @staticmethod
+    def compiler_version() -> str:
+        """
+        Returns:
+            str: a hash of the compiler's own sources, so that changing the
+            compiler invalidates everything it compiled before.
+        """
+        digest = hashlib.sha256()
+        compiler_directory = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(compiler_directory, "*.py"))):
+            with open(path, 'rb') as source_file:
+                digest.update(source_file.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def stamp(path: str) -> typing.Optional[typing.List[int]]:
+        """
+        Args:
+            path (str): a file.
+
+        Returns:
+            typing.Optional[typing.List[int]]: the size and modification time
+            of the file, or None if it does not exist.
+        """
+        try:
+            status = os.stat(path)
+        except OSError:
+            return None
+        return [status.st_size, status.st_mtime_ns]
+
+    def blob_path(self, key: str) -> str:
+        """
+        Args:
+            key (str): a cache key.
+
+        Returns:
+            str: the path of the blob holding the output stored under the key.
+        """
+        return os.path.join(self.directory, key + ".out")
+
+    def restore(self, input_path: str, output_path: str) -> bool:
+        """Brings the output of a source up to date from the cache, if the
+        cache knows it.
+
+        Args:
+            input_path (str): the source file.
+            output_path (str): the output file compiled from it.
+
+        Returns:
+            bool: True if the output is up to date, False if the source has to
+            be compiled (and then passed to store()).
+        """
+        entry = self.manifest.get(output_path)
+        source_stamp = self.stamp(input_path)
+        if entry is not None and entry["compiler"] == self.compiler \
+                and entry["source"] == source_stamp \
+                and entry["output"] == self.stamp(output_path):
+            return True
+        digest = hashlib.sha256(self.compiler.encode())
+        with open(input_path, 'rb') as source_file:
+            digest.update(source_file.read())
+        key = digest.hexdigest()
+        self.keys[output_path] = (key, source_stamp)
+        if not os.path.exists(self.blob_path(key)):
+            return False
+        if entry is None or entry["key"] != key \
+                or entry["output"] != self.stamp(output_path):
+            shutil.copyfile(self.blob_path(key), output_path)
+        self.manifest[output_path] = {
+            "compiler": self.compiler, "key": key, "source": source_stamp,
+            "output": self.stamp(output_path)}
+        return True
+
+    def store(self, input_path: str, output_path: str) -> None:
+        """Stores a freshly compiled output in the cache.
+
+        Args:
+            input_path (str): the source file.
+            output_path (str): the output file compiled from it, as given to
+            restore().
+        """
+        key, source_stamp = self.keys.pop(output_path)
+        shutil.copyfile(output_path, self.blob_path(key))
+        self.manifest[output_path] = {
+            "compiler": self.compiler, "key": key, "source": source_stamp,
+            "output": self.stamp(output_path)}
+
+    def save(self) -> None:
+        """Writes the manifest and deletes the blobs it no longer refers to."""
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.manifest_path)
+        used = {entry["key"] + ".out" for entry in self.manifest.values()}
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".out") and filename not in used:
+                os.remove(os.path.join(self.directory, filename))
@@ -6,8 +6,13 @@ as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 import typing
-from JackTokenizer import JackTokenizer
+import SyntaxTree
+from CompilerStats import CompilerStats
+from Inliner import Inliner
+from JackTokenizer import JackTokenizer, Terminal, mask
+from PeepholeOptimizer import PeepholeOptimizer
 from SymbolTable import SymbolTable
+from Tracer import Tracer
 from VMWriter import VMWriter
 
 
@@ -16,17 +21,113 @@ class CompilationEngine:
     output stream.
     """
 
-    def __init__(self, input_stream: "JackTokenizer", output_stream) -> None:
+    # The optional optimizations, by the names they are enabled with:
+    # - strength: multiplication and division by constants use shifts and adds
+    #   instead of calling Math.multiply and Math.divide where possible.
+    # - peephole: the VM code of every function is rewritten by the passes of
+    #   a PeepholeOptimizer before it is written.
+    # - dead: statements that can never run are not written: those after a
+    #   return or an endless loop, and branches of if and while statements
+    #   whose conditions are constant.
+    # - strings: every string literal of a class is built once, by a function
+    #   the class gets for this, and kept in a static variable. Evaluating a
+    #   literal then pushes the same String object every time, so programs
+    #   that change or dispose of literal strings must not use this.
+    # - inline: calls to small leaf functions and methods of the same class
+    #   are replaced by their bodies (see Inliner). Implies AST mode.
+    OPTIMIZATIONS = ("strength", "peephole", "dead", "strings", "inline")
+
+    # The sets of terminals the parser expects and looks ahead for, as
+    # bitmasks (see JackTokenizer.at()). They are built once, here, and
+    # checking a token against one is a single shift and and. The sets named
+    # after a production are its FIRST set: the terminals it can start with.
+    CLASS = mask(Terminal.CLASS)
+    VAR = mask(Terminal.VAR)
+    LET = mask(Terminal.LET)
+    DO = mask(Terminal.DO)
+    IF = mask(Terminal.IF)
+    ELSE = mask(Terminal.ELSE)
+    WHILE = mask(Terminal.WHILE)
+    RETURN = mask(Terminal.RETURN)
+    LEFT_BRACE = mask(Terminal.LEFT_BRACE)
+    RIGHT_BRACE = mask(Terminal.RIGHT_BRACE)
+    LEFT_PAREN = mask(Terminal.LEFT_PAREN)
+    RIGHT_PAREN = mask(Terminal.RIGHT_PAREN)
+    LEFT_BRACKET = mask(Terminal.LEFT_BRACKET)
+    RIGHT_BRACKET = mask(Terminal.RIGHT_BRACKET)
+    DOT = mask(Terminal.DOT)
+    COMMA = mask(Terminal.COMMA)
+    SEMICOLON = mask(Terminal.SEMICOLON)
+    EQUALS = mask(Terminal.EQUALS)
+    IDENTIFIER = mask(Terminal.IDENTIFIER)
+    INT_CONST = mask(Terminal.INT_CONST)
+    STRING_CONST = mask(Terminal.STRING_CONST)
+    CLASS_VAR_KINDS = mask(Terminal.STATIC, Terminal.FIELD)
+    SUBROUTINE_KINDS = mask(Terminal.CONSTRUCTOR, Terminal.FUNCTION,
+                            Terminal.METHOD)
+    TYPES = mask(Terminal.INT, Terminal.CHAR, Terminal.BOOLEAN,
+                 Terminal.IDENTIFIER)
+    RETURN_TYPES = TYPES | mask(Terminal.VOID)
+    STATEMENTS = mask(Terminal.LET, Terminal.IF, Terminal.WHILE, Terminal.DO,
+                      Terminal.RETURN)
+    KEYWORD_CONSTANTS = mask(Terminal.TRUE, Terminal.FALSE, Terminal.NULL,
+                             Terminal.THIS)
+    BINARY_OPS = mask(Terminal.PLUS, Terminal.MINUS, Terminal.ASTERISK,
+                      Terminal.SLASH, Terminal.AMPERSAND, Terminal.BAR,
+                      Terminal.LESS, Terminal.GREATER, Terminal.EQUALS)
+    UNARY_OPS = mask(Terminal.MINUS, Terminal.TILDE, Terminal.CARET,
+                     Terminal.HASH)
+    EXPRESSIONS = INT_CONST | STRING_CONST | KEYWORD_CONSTANTS | IDENTIFIER \
+        | UNARY_OPS | LEFT_PAREN
+    CALL_SUFFIXES = mask(Terminal.DOT, Terminal.LEFT_PAREN)
+
+    # How tightly the binary operators bind in precedence mode, as in C: *
+    # and / before + and -, before the comparisons, before & and then |.
+    PRECEDENCE = {"|": 1, "&": 2, "=": 3, "<": 4, ">": 4, "+": 5, "-": 5,
+                  "*": 6, "/": 6}
+
+    def __init__(self, input_stream: "JackTokenizer", output_stream,
+                 tracer: typing.Optional[Tracer] = None,
+                 vm_writer: typing.Optional[VMWriter] = None,
+                 optimizations: typing.Collection[str] = (),
+                 ast: bool = False,
+                 passes: typing.Sequence[
+                     typing.Callable[[SyntaxTree.Class], SyntaxTree.Class]] = (),
+                 inline_threshold: typing.Optional[int] = None,
+                 stats: typing.Optional[CompilerStats] = None,
+                 precedence: bool = False) -> None:
         """
         Creates a new compilation engine with the given input and output. The
         next routine called must be compileClass()
         :param input_stream: The input stream.
         :param output_stream: The output stream.
+        :param tracer: If given, consumed tokens and productions are traced
+        into it.
+        :param vm_writer: The writer to emit VM code with, e.g. a
+        BinaryVMWriter. Defaults to a VMWriter on the output stream.
+        :param optimizations: The names of the OPTIMIZATIONS to apply.
+        :param ast: Whether to parse every class into a syntax tree before
+        writing any of it, instead of writing each statement once parsed.
+        :param passes: In AST mode, functions transforming the syntax tree of
+        every class, applied in order before it is written.
+        :param inline_threshold: The size up to which subroutines are inlined,
+        by default Inliner.threshold.
+        :param stats: If given, the symbol lookups and the VM commands written
+        are counted into it.
+        :param precedence: Whether binary operators bind by PRECEDENCE
+        instead of applying left to right, as the Jack language has them.
+        Every expression is then rearranged for evaluation (see
+        SyntaxTree.arrange()).
         """
 
 
         self.is_void = False
-        self.vm = VMWriter(output_stream)
+        self.vm = vm_writer if vm_writer is not None else VMWriter(output_stream)
+        self.stats = stats
+        if stats is not None:
+            stats.count_instructions(self.vm)
+        if "peephole" in optimizations:
+            self.vm = PeepholeOptimizer(self.vm)
         self.tokenizer = input_stream
         self.num_tabs = 0
         self.num_label_while = 0
@@ -35,94 +136,193 @@ class CompilationEngine:
         self.class_name = ""
         self.function_name = ""
         self.sub_type = ""
+        self.strength_reduction = "strength" in optimizations
+        self.dead_code_elimination = "dead" in optimizations
+        self.string_pool = "strings" in optimizations
+        # The static variable holding every pooled string literal.
+        self.strings = {}
+        self.num_label_string = 0
+        # Whether the code being written can be reached, i.e. the previous
+        # statement can complete normally.
+        self.reachable = True
+        self.ast = ast or "inline" in optimizations
+        self.precedence = precedence
+        # How many expressions the one being parsed is nested in.
+        self.expression_depth = 0
+        self.passes = list(passes)
+        if "inline" in optimizations:
+            self.passes.append(Inliner(inline_threshold))
 
         self.op_map = {
-            "+": "ADD", "-": "SUB", "-": "NEG", "=": "EQ", "&gt;": "GT", "&lt;": "LT",
-            "&amp;": "AND", "|": "OR", "~": "NOT", "^": "SHIFTLEFT", "#": "SHIFTRIGHT"
+            "+": "ADD", "-": "SUB", "-": "NEG", "=": "EQ", ">": "GT", "<": "LT",
+            "&": "AND", "|": "OR", "~": "NOT", "^": "SHIFTLEFT", "#": "SHIFTRIGHT"
         }
 
-        self.kind_map = {
-            "VAR": "local", "STATIC": "static", "FIELD": "this", "ARG": "argument"
+        self.expression_writers = {
+            SyntaxTree.Constant: self.write_constant,
+            SyntaxTree.StringConstant: self.write_string_constant,
+            SyntaxTree.This: self.write_this,
+            SyntaxTree.Variable: self.write_variable,
+            SyntaxTree.ArrayElement: self.write_array_element,
+            SyntaxTree.Call: self.write_call,
+            SyntaxTree.UnaryOp: self.write_unary_op,
+            SyntaxTree.BinaryOp: self.write_binary_op,
+            SyntaxTree.Inline: self.write_inline,
         }
 
-    def process(self, s):
-        token = ""
-        ident = ""
-
-        if self.tokenizer.token_type() == "KEYWORD":
-            ident = "keyword"
-            token = self.tokenizer.keyword().lower()
-        if self.tokenizer.token_type() == "SYMBOL":
-            ident = "symbol"
-            token = self.tokenizer.symbol()
-        if self.tokenizer.token_type() == "IDENTIFIER":
-            ident = "identifier"
-            token = self.tokenizer.identifier()
-        if self.tokenizer.token_type() == "STRING_CONST":
-            ident = "stringConstant"
-            token = self.tokenizer.string_val()
-        if self.tokenizer.token_type() == "INT_CONST":
-            ident = "integerConstant"
-            token = self.tokenizer.int_val()
-
-        if token not in s:
-            print("syntax error in token " + token + " of type " + self.tokenizer.token_type()
-                  + " which was supposed to be in" + str(s)
-                  + " in line number " + str(self.tokenizer.num_line) + ":\n" + self.tokenizer.line)
+        self.statement_writers = {
+            SyntaxTree.Let: self.write_let,
+            SyntaxTree.If: self.write_if,
+            SyntaxTree.While: self.write_while,
+            SyntaxTree.Do: self.write_do,
+            SyntaxTree.Return: self.write_return,
+        }
+
+        if tracer is not None:
+            self.trace(tracer)
+
+        # The production to parse, by the first terminal of a statement or a
+        # term. Built after tracing, so that traced engines dispatch to the
+        # traced productions.
+        self.statement_parsers = {
+            Terminal.LET: self.parse_let,
+            Terminal.IF: self.parse_if,
+            Terminal.WHILE: self.parse_while,
+            Terminal.DO: self.parse_do,
+            Terminal.RETURN: self.parse_return,
+        }
+
+        self.term_parsers = {
+            Terminal.INT_CONST: self.parse_integer_constant,
+            Terminal.STRING_CONST: self.parse_string_constant,
+            Terminal.TRUE: self.parse_keyword_constant,
+            Terminal.FALSE: self.parse_keyword_constant,
+            Terminal.NULL: self.parse_keyword_constant,
+            Terminal.THIS: self.parse_keyword_constant,
+            Terminal.IDENTIFIER: self.parse_name,
+            Terminal.INVALID: self.parse_invalid,
+            Terminal.MINUS: self.parse_unary_op,
+            Terminal.TILDE: self.parse_unary_op,
+            Terminal.CARET: self.parse_unary_op,
+            Terminal.HASH: self.parse_unary_op,
+            Terminal.LEFT_PAREN: self.parse_parenthesized,
+        }
+
+    def trace(self, tracer: Tracer) -> None:
+        """Routes the consumed tokens and every compile_* and parse_*
+        production through the given tracer. Only traced engines have their
+        methods wrapped.
+        """
+        self.process = tracer.consumer(self.tokenizer, self.process)
+        for name in dir(self):
+            if name.startswith("compile_") or name.startswith("parse_"):
+                setattr(self, name,
+                        tracer.production(name[name.index("_") + 1:],
+                                          getattr(self, name)))
+
+    def error(self, message: str) -> None:
+        """Reports an error at the current token, with its line if the
+        tokenizer can find it.
+
+        Args:
+            message (str): what is wrong.
+        """
+        line = self.tokenizer.line()
+        print(("" if line is None else "line " + str(line) + ": ") + message)
+
+    def process(self, expected: int):
+        """Consumes the current token, which should be one of the expected
+        terminals, and reports a syntax error otherwise.
+
+        Args:
+            expected (int): the terminals, as a bitmask.
+
+        Returns:
+            the value of the token.
+        """
+        token = self.tokenizer.current
+
+        if not 1 << token.terminal & expected:
+            if not token.kind and str(token.value).startswith('"'):
+                self.error("unterminated string constant")
+            else:
+                print("syntax error in token " + str(token.value) + " of type "
+                      + token.kind + " which was supposed to be in "
+                      + str(JackTokenizer.spell(expected)))
 
         #else:
         #    self.o.write("  "*self.num_tabs + "<" + ident + "> " + token + " </" + ident + ">\n")
 
         self.tokenizer.advance()
 
-        return token
+        return token.value
 
 
     def compile_class(self) -> None:
-        self.symbol_table = SymbolTable()
-
-        #self.o.write("  "*self.num_tabs + "<class>\n")
-        self.num_tabs += 1
-
-        self.process(["class"])
-        self.class_name = self.process([self.tokenizer.identifier()])
-        self.process(["{"])
+        """Compiles a complete class. In AST mode the class is parsed into a
+        syntax tree first, which the passes transform before it is written.
+        """
+        if self.ast:
+            node = self.parse_class()
+            for optimization in self.passes:
+                node = optimization(node)
+            self.write_class(node)
+            return
 
-        while self.tokenizer.token_type() == "KEYWORD" and \
-                (self.tokenizer.keyword() == "FIELD" or self.tokenizer.keyword() == "STATIC"):
-            self.compile_class_var_dec()
+        self.parse_class_header()
 
-        while self.tokenizer.token_type() == "KEYWORD" and \
-            (self.tokenizer.keyword() == "CONSTRUCTOR" or self.tokenizer.keyword() == "FUNCTION" \
-             or self.tokenizer.keyword() == "METHOD"):
+        while self.tokenizer.at(self.SUBROUTINE_KINDS):
             self.compile_subroutine()
 
-        self.process(["}"])
+        self.process(self.RIGHT_BRACE)
+        self.write_string_pool()
+        self.vm.flush()
 
-        self.num_tabs -= 1
-        #self.o.write("  "*self.num_tabs + "</class>\n")
+    def parse_class(self) -> SyntaxTree.Class:
+        """Parses a complete class into a syntax tree."""
+        self.parse_class_header()
+        subroutines = []
+
+        while self.tokenizer.at(self.SUBROUTINE_KINDS):
+            subroutines.append(self.parse_subroutine())
 
-        #print(str(self.symbol_table.d))
+        self.process(self.RIGHT_BRACE)
+        return SyntaxTree.Class(self.class_name,
+                                self.symbol_table.var_count("FIELD"), subroutines)
 
+    def parse_class_header(self) -> None:
+        """Parses the start of a class up to its subroutines: its name and
+        its static and field declarations.
+        """
+        self.symbol_table = SymbolTable()
+        if self.stats is not None:
+            self.stats.count_lookups(self.symbol_table)
+        self.strings = {}
 
+        self.tokenizer.advance()
+        self.process(self.CLASS)
+        self.class_name = self.process(self.IDENTIFIER)
+        self.process(self.LEFT_BRACE)
 
+        while self.tokenizer.at(self.CLASS_VAR_KINDS):
+            self.compile_class_var_dec()
 
     def compile_class_var_dec(self) -> None:
         """Compiles a static declaration or a field declaration."""
         #self.o.write("  " * self.num_tabs + "<classVarDec>\n")
         self.num_tabs += 1
 
-        kind = self.process(["static", "field"]).upper()
-        type = self.process(["int", "char", "boolean", self.tokenizer.identifier()])
-        name = self.process([self.tokenizer.identifier()])
+        kind = self.process(self.CLASS_VAR_KINDS).upper()
+        type = self.process(self.TYPES)
+        name = self.process(self.IDENTIFIER)
         self.symbol_table.define(name, type, kind)
 
-        while self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ",":
-            self.process([","])
-            name = self.process([self.tokenizer.identifier()])
+        while self.tokenizer.at(self.COMMA):
+            self.process(self.COMMA)
+            name = self.process(self.IDENTIFIER)
             self.symbol_table.define(name, type, kind)
 
-        self.process([";"])
+        self.process(self.SEMICOLON)
 
 
 
@@ -135,26 +335,10 @@ class CompilationEngine:
         You can assume that classes with constructors have at least one field,
         you will understand why this is necessary in project 11.
         """
-        self.symbol_table.start_subroutine()
-
         #self.o.write("  " * self.num_tabs + "<subroutineDec>\n")
         self.num_tabs += 1
-        self.num_label_while = 0
-        self.num_label_if = 0
-
-        self.sub_type = self.process(["constructor", "function", "method"])
-        if self.sub_type == "method":
-            self.symbol_table.define("this", self.class_name, "ARG")
-
-
-        self.is_void = (self.process(["void", "int", "char", "boolean", self.tokenizer.identifier()]) == "void")
-
-        function_name = self.process([self.tokenizer.identifier()])
-        self.process(["("])
-        self.compile_parameter_list()
-        self.process([")"])
-
 
+        function_name = self.parse_subroutine_header()
         self.compile_subroutine_body(function_name)
 
         self.num_tabs -= 1
@@ -162,30 +346,58 @@ class CompilationEngine:
 
         #print(str(self.symbol_table.s))
 
+    def parse_subroutine(self) -> SyntaxTree.Subroutine:
+        """Parses a complete method, function, or constructor into a syntax
+        tree.
+        """
+        function_name = self.parse_subroutine_header()
+        self.process(self.LEFT_BRACE)
+        while self.tokenizer.at(self.VAR):
+            self.compile_var_dec()
+        statements = self.parse_statements()
+        self.process(self.RIGHT_BRACE)
+        return SyntaxTree.Subroutine(
+            self.sub_type, self.class_name + "." + function_name,
+            self.symbol_table.var_count("ARG"), self.symbol_table.var_count("VAR"),
+            statements)
+
+    def parse_subroutine_header(self) -> str:
+        """Parses a subroutine up to its body, defining its parameters.
+
+        Returns:
+            str: the name of the subroutine, without the class name.
+        """
+        self.symbol_table.start_subroutine()
+
+        self.sub_type = self.process(self.SUBROUTINE_KINDS)
+        if self.sub_type == "method":
+            self.symbol_table.define("this", self.class_name, "ARG")
+
+
+        self.is_void = (self.process(self.RETURN_TYPES) == "void")
+
+        function_name = self.process(self.IDENTIFIER)
+        self.process(self.LEFT_PAREN)
+        self.compile_parameter_list()
+        self.process(self.RIGHT_PAREN)
+        return function_name
 
     def compile_subroutine_body(self, function_name) -> None:
         #self.o.write("  " * self.num_tabs + "<subroutineBody>\n")
         self.num_tabs += 1
 
 
-        self.process(["{"])
-        while self.tokenizer.token_type() == "KEYWORD" and self.tokenizer.keyword() == "VAR":
+        self.process(self.LEFT_BRACE)
+        while self.tokenizer.at(self.VAR):
             self.compile_var_dec()
 
-        self.vm.write_function(self.class_name + "." + function_name, self.symbol_table.var_count("VAR"))
-
-        if self.sub_type == "method":
-            self.vm.write_push("argument", 0)
-            self.vm.write_pop("pointer", 0)
-
-        if self.sub_type == "constructor":
-            self.vm.write_push("constant", self.symbol_table.var_count("FIELD"))
-            self.vm.write_call("Memory.alloc", 1)
-            self.vm.write_pop("pointer", 0)
+        self.write_subroutine_header(
+            self.sub_type, self.class_name + "." + function_name,
+            self.symbol_table.var_count("VAR"), self.symbol_table.var_count("FIELD"))
 
         self.compile_statements()
 
-        self.process(["}"])
+        self.process(self.RIGHT_BRACE)
 
         self.num_tabs -= 1
         #self.o.write("  " * self.num_tabs + "</subroutineBody>\n")
@@ -199,17 +411,16 @@ class CompilationEngine:
         self.num_tabs += 1
         num_args = 0
 
-        if (self.tokenizer.token_type() == "KEYWORD" and self.tokenizer.keyword() in ["INT", "CHAR", "BOOLEAN"]) or \
-                self.tokenizer.token_type() == "IDENTIFIER":
-            type = self.process(["int", "char", "boolean", self.tokenizer.identifier()])
-            name = self.process([self.tokenizer.identifier()])
+        if self.tokenizer.at(self.TYPES):
+            type = self.process(self.TYPES)
+            name = self.process(self.IDENTIFIER)
             self.symbol_table.define(name, type, "ARG")
             num_args += 1
 
-            while self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ",":
-                self.process([","])
-                type = self.process(["int", "char", "boolean", self.tokenizer.identifier()])
-                name = self.process([self.tokenizer.identifier()])
+            while self.tokenizer.at(self.COMMA):
+                self.process(self.COMMA)
+                type = self.process(self.TYPES)
+                name = self.process(self.IDENTIFIER)
                 self.symbol_table.define(name, type, "ARG")
                 num_args += 1
 
@@ -222,17 +433,17 @@ class CompilationEngine:
         #self.o.write("  " * self.num_tabs + "<varDec>\n")
         self.num_tabs += 1
 
-        self.process(["var"])
-        type = self.process(["int", "char", "boolean", self.tokenizer.identifier()])
-        name = self.process([self.tokenizer.identifier()])
+        self.process(self.VAR)
+        type = self.process(self.TYPES)
+        name = self.process(self.IDENTIFIER)
         self.symbol_table.define(name, type, "VAR")
 
-        while self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ",":
-            self.process([","])
-            name = self.process([self.tokenizer.identifier()])
+        while self.tokenizer.at(self.COMMA):
+            self.process(self.COMMA)
+            name = self.process(self.IDENTIFIER)
             self.symbol_table.define(name, type, "VAR")
 
-        self.process([";"])
+        self.process(self.SEMICOLON)
 
         self.num_tabs -= 1
         #self.o.write("  " * self.num_tabs + "</varDec>\n")
@@ -241,314 +452,557 @@ class CompilationEngine:
 
     def compile_statements(self) -> None:
         """Compiles a sequence of statements, not including the enclosing 
-        "{}".
+        "{}". Each statement is written as soon as it is parsed.
         """
-        #self.o.write("  " * self.num_tabs + "<statements>\n")
-        self.num_tabs += 1
-
-        while self.tokenizer.token_type() == "KEYWORD" and \
-                self.tokenizer.keyword() in ["LET", "IF", "WHILE", "DO", "RETURN"]:
-            if self.tokenizer.keyword() == "LET":
-                self.compile_let()
-            elif self.tokenizer.keyword() == "IF":
-                self.compile_if()
-            elif self.tokenizer.keyword() == "WHILE":
-                self.compile_while()
-            elif self.tokenizer.keyword() == "DO":
-                self.compile_do()
-            elif self.tokenizer.keyword() == "RETURN":
-                self.compile_return()
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</statements>\n")
+        parse = self.statement_parsers.get(self.tokenizer.terminal())
+        while parse is not None:
+            self.write_statement(parse())
+            parse = self.statement_parsers.get(self.tokenizer.terminal())
 
     def compile_do(self) -> None:
         """Compiles a do statement."""
-        #---------------------------------------------------- ADD NEW IMPLEMENTATIONS TO EXPRESSION LIST AS WELL------------
-        #self.o.write("  " * self.num_tabs + "<doStatement>\n")
-        self.num_tabs += 1
-        num_args = 0
-        var_cond = True
+        self.write_statement(self.parse_do())
 
-        self.process(["do"])
-        function_name = self.process([self.tokenizer.identifier()])
-        var_name = function_name
+    def compile_let(self) -> None:
+        """Compiles a let statement."""
+        self.write_statement(self.parse_let())
 
-        if self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ".":
-            self.process(["."])
-            if self.symbol_table.type_of(var_name) is not None:
-                function_name = self.symbol_table.type_of(var_name) + "." + self.process([self.tokenizer.identifier()])
-            else:
-                var_cond = False
-                function_name = var_name + "." + self.process([self.tokenizer.identifier()])
-        else:
-            function_name = self.class_name + "." + var_name
+    def compile_while(self) -> None:
+        """Compiles a while statement."""
+        self.write_statement(self.parse_while())
 
+    def compile_return(self) -> None:
+        """Compiles a return statement."""
+        self.write_statement(self.parse_return())
 
-        if self.symbol_table.type_of(var_name) is None:
-            #AMMEND LATER, HOW DO YOU KNOW IF YOU SHOULD PUSH THE POINTER????
-            if function_name[:function_name.index(".")] == self.class_name and var_cond:
-                num_args += 1
-                self.vm.write_push("pointer", 0)
-        elif self.symbol_table.kind_of(var_name) in self.kind_map.keys():
-            self.vm.write_push(self.kind_map[self.symbol_table.kind_of(var_name)], self.symbol_table.index_of(var_name))
-            num_args += 1
+    def compile_if(self) -> None:
+        """Compiles a if statement, possibly with a trailing else clause."""
+        self.write_statement(self.parse_if())
 
+    def parse_statements(self) -> typing.List[SyntaxTree.Node]:
+        """Parses a sequence of statements, not including the enclosing "{}".
+        """
+        statements = []
+        parse = self.statement_parsers.get(self.tokenizer.terminal())
+        while parse is not None:
+            statements.append(parse())
+            parse = self.statement_parsers.get(self.tokenizer.terminal())
+        return statements
+
+    def parse_statement(self) -> SyntaxTree.Node:
+        """Parses a single statement, which must start with one of
+        STATEMENTS.
+        """
+        return self.statement_parsers[self.tokenizer.terminal()]()
+
+    def parse_do(self) -> SyntaxTree.Do:
+        self.process(self.DO)
+        call = self.parse_subroutine_call(self.process(self.IDENTIFIER))
+        self.process(self.SEMICOLON)
+        return SyntaxTree.Do(call)
+
+    def parse_let(self) -> SyntaxTree.Let:
+        index = None
+
+        self.process(self.LET)
+        name = self.process(self.IDENTIFIER)
+        segment, position = self.resolve_variable(name)
+        if self.tokenizer.at(self.LEFT_BRACKET):
+            self.process(self.LEFT_BRACKET)
+            index = self.parse_expression()
+            self.process(self.RIGHT_BRACKET)
+        self.process(self.EQUALS)
+        value = self.parse_expression()
+        self.process(self.SEMICOLON)
+        return SyntaxTree.Let(SyntaxTree.Variable(segment, position), index, value)
+
+    def parse_while(self) -> SyntaxTree.While:
+        self.process(self.WHILE)
+        self.process(self.LEFT_PAREN)
+        condition = self.parse_expression()
+        self.process(self.RIGHT_PAREN)
+        self.process(self.LEFT_BRACE)
+        statements = self.parse_statements()
+        self.process(self.RIGHT_BRACE)
+        return SyntaxTree.While(condition, statements)
+
+    def parse_return(self) -> SyntaxTree.Return:
+        value = None
+        self.process(self.RETURN)
+        if self.tokenizer.at(self.EXPRESSIONS):
+            value = self.parse_expression()
+        self.process(self.SEMICOLON)
+        if self.is_void:
+            value = SyntaxTree.Constant(0)
+        return SyntaxTree.Return(value)
+
+    def parse_if(self) -> SyntaxTree.If:
+        else_statements = None
+
+        self.process(self.IF)
+        self.process(self.LEFT_PAREN)
+        condition = self.parse_expression()
+        self.process(self.RIGHT_PAREN)
+        self.process(self.LEFT_BRACE)
+        statements = self.parse_statements()
+        self.process(self.RIGHT_BRACE)
+
+        if self.tokenizer.at(self.ELSE):
+            self.process(self.ELSE)
+            self.process(self.LEFT_BRACE)
+            else_statements = self.parse_statements()
+            self.process(self.RIGHT_BRACE)
+        return SyntaxTree.If(condition, statements, else_statements)
 
-        self.process(["("])
-        num_args += self.compile_expression_list()
-        self.process([")"])
+    def compile_expression(self) -> None:
+        """Compiles an expression. """
+        self.write_expression(self.parse_expression())
 
+    def compile_term(self) -> None:
+        """Compiles a term. """
+        self.write_expression(self.parse_term())
 
+    def compile_expression_list(self) -> int:
+        """Compiles a (possibly empty) comma-separated list of expressions. expressionList"""
+        expressions = self.parse_expression_list()
+        for expression in expressions:
+            self.write_expression(expression)
+        return len(expressions)
+
+    def parse_expression(self) -> SyntaxTree.Node:
+        """Parses an expression into a syntax tree. Operators are applied left
+        to right, and constant subexpressions are folded on the way.
+        In precedence mode, operators bind by PRECEDENCE instead, and every
+        outermost expression is rearranged once it is parsed, subexpressions
+        included.
+        """
+        if self.precedence:
+            self.expression_depth += 1
+            node = self.parse_operation(1)
+            self.expression_depth -= 1
+            return node if self.expression_depth else SyntaxTree.arrange(node)
+        node = self.parse_term()
+        while self.tokenizer.at(self.BINARY_OPS):
+            op = self.process(self.BINARY_OPS)
+            node = SyntaxTree.binary(op, node, self.parse_term())
+        return node
+
+    def parse_operation(self, lowest: int) -> SyntaxTree.Node:
+        """Parses terms joined by operators of at least the given precedence,
+        by precedence climbing. Operators of the same precedence apply left
+        to right.
+
+        Args:
+            lowest (int): the lowest PRECEDENCE of the operators to take.
+
+        Returns:
+            SyntaxTree.Node: the syntax tree.
+        """
+        node = self.parse_term()
+        while self.tokenizer.at(self.BINARY_OPS):
+            precedence = self.PRECEDENCE[self.tokenizer.token_value()]
+            if precedence < lowest:
+                break
+            op = self.process(self.BINARY_OPS)
+            node = SyntaxTree.binary(op, node, self.parse_operation(precedence + 1))
+        return node
+
+    def parse_term(self) -> SyntaxTree.Node:
+        """Parses a term into a syntax tree, with the production its first
+        token starts. Anything else is reported as a missing "(".
+        """
+        return self.term_parsers.get(self.tokenizer.terminal(),
+                                     self.parse_parenthesized)()
 
-        self.process([";"])
+    def parse_integer_constant(self) -> SyntaxTree.Constant:
+        return SyntaxTree.Constant(self.process(self.INT_CONST))
 
-        self.vm.write_call(function_name, num_args)
-        self.vm.write_pop("temp", 0)
+    def parse_string_constant(self) -> SyntaxTree.StringConstant:
+        return SyntaxTree.StringConstant(self.process(self.STRING_CONST))
 
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</doStatement>\n")
+    def parse_invalid(self) -> SyntaxTree.Constant:
+        """Reports an invalid token where a term should be, such as a string
+        that is not closed, and parses it as 0 so that parsing goes on.
+        """
+        self.process(self.EXPRESSIONS)
+        return SyntaxTree.Constant(0)
 
+    def parse_keyword_constant(self) -> SyntaxTree.Node:
+        const = self.process(self.KEYWORD_CONSTANTS)
+        if const == "this":
+            return SyntaxTree.This()
+        return SyntaxTree.Constant(-1 if const == "true" else 0)
 
-    def compile_let(self) -> None:
-        """Compiles a let statement."""
-        #self.o.write("  " * self.num_tabs + "<letStatement>\n")
-        self.num_tabs += 1
-        is_arr = False
-
-        self.process(["let"])
-        name = self.process([self.tokenizer.identifier()])
-        if self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == "[":
-            is_arr = True
-            self.process(["["])
-            self.compile_expression()
-            self.process(["]"])
-            self.vm.write_push(self.kind_map[self.symbol_table.kind_of(name)], self.symbol_table.index_of(name))
-            self.vm.write_arithmetic("ADD")
-        self.process(["="])
-        self.compile_expression()
-        self.process([";"])
+    def parse_name(self) -> SyntaxTree.Node:
+        """Parses a term starting with an identifier.
+        This routine is faced with a slight difficulty when
+        trying to decide between some of the alternative parsing rules.
+        Specifically, if the current token is an identifier, the routing must
+        distinguish between a variable, an array entry, and a subroutine call.
+        A single look-ahead token, which may be one of "[", "(", or "." suffices
+        to distinguish between the three possibilities. Any other token is not
+        part of this term and should not be advanced over.
+        """
+        name = self.process(self.IDENTIFIER)
+        if self.tokenizer.at(self.LEFT_BRACKET):
+            segment, index = self.resolve_variable(name)
+            self.process(self.LEFT_BRACKET)
+            node = SyntaxTree.ArrayElement(SyntaxTree.Variable(segment, index),
+                                           self.parse_expression())
+            self.process(self.RIGHT_BRACKET)
+            return node
+        elif self.tokenizer.at(self.CALL_SUFFIXES):
+            return self.parse_subroutine_call(name)
+        segment, index = self.resolve_variable(name)
+        return SyntaxTree.Variable(segment, index)
+
+    def resolve_variable(self, name: str) -> typing.Tuple[str, int]:
+        """Resolves the name of a variable that was just consumed, and reports
+        it if it is not defined.
+
+        Args:
+            name (str): the name.
+
+        Returns:
+            typing.Tuple[str, int]: the VM segment and index of the variable,
+            or the constant 0 if it is not defined, so that parsing goes on.
+        """
+        symbol = self.symbol_table.resolve(name)
+        if symbol is None:
+            self.error("undefined variable '" + name + "'")
+            return "constant", 0
+        return symbol[0], symbol[1]
+
+    def parse_unary_op(self) -> SyntaxTree.Node:
+        op = self.process(self.UNARY_OPS)
+        return SyntaxTree.unary(op, self.parse_term())
+
+    def parse_parenthesized(self) -> SyntaxTree.Node:
+        self.process(self.LEFT_PAREN)
+        node = self.parse_expression()
+        self.process(self.RIGHT_PAREN)
+        return node
+
+    def parse_subroutine_call(self, name: str) -> SyntaxTree.Call:
+        """Parses the rest of a subroutine call whose first identifier was
+        already consumed. Method calls get their object as the first argument.
+        """
+        symbol = self.symbol_table.resolve(name)
+        arguments = []
+        if self.tokenizer.at(self.DOT):
+            self.process(self.DOT)
+            if symbol is not None:
+                # A method call on an object held in a variable.
+                function_name = symbol[2] + "." + self.process(self.IDENTIFIER)
+                arguments.append(SyntaxTree.Variable(symbol[0], symbol[1]))
+            else:
+                # A function or constructor call through a class name.
+                function_name = name + "." + self.process(self.IDENTIFIER)
+        else:
+            # A method call on this object.
+            function_name = self.class_name + "." + name
+            arguments.append(SyntaxTree.This())
+
+        self.process(self.LEFT_PAREN)
+        arguments.extend(self.parse_expression_list())
+        self.process(self.RIGHT_PAREN)
+        return SyntaxTree.Call(function_name, arguments)
+
+    def parse_expression_list(self) -> typing.List[SyntaxTree.Node]:
+        """Parses a (possibly empty) comma-separated list of expressions."""
+        expressions = []
+        if self.tokenizer.at(self.EXPRESSIONS):
+            expressions.append(self.parse_expression())
+
+            while self.tokenizer.at(self.COMMA):
+                self.process(self.COMMA)
+                expressions.append(self.parse_expression())
+        return expressions
+
+    def write_class(self, node: SyntaxTree.Class) -> None:
+        """Writes the VM code of a whole class and flushes the writer."""
+        for subroutine in node.subroutines:
+            self.write_subroutine(subroutine, node.n_fields)
+        self.write_string_pool()
+        self.vm.flush()
+
+    def write_subroutine(self, node: SyntaxTree.Subroutine, n_fields: int) -> None:
+        self.write_subroutine_header(node.kind, node.name, node.n_locals, n_fields)
+        self.write_statements(node.statements)
+
+    def write_subroutine_header(self, kind: str, name: str, n_locals: int,
+                                n_fields: int) -> None:
+        """Writes the function command of a subroutine, followed by the code
+        setting up this for methods and constructors.
+        """
+        self.num_label_while = 0
+        self.num_label_if = 0
+        self.num_label_string = 0
+        self.reachable = True
+
+        self.vm.write_function(name, n_locals)
+
+        if kind == "method":
+            self.vm.write_push("argument", 0)
+            self.vm.write_pop("pointer", 0)
 
-        if is_arr:
+        if kind == "constructor":
+            self.vm.write_push("constant", n_fields)
+            self.vm.write_call("Memory.alloc", 1)
+            self.vm.write_pop("pointer", 0)
+
+    def write_statements(self, statements: typing.List[SyntaxTree.Node]) -> None:
+        for statement in statements:
+            self.write_statement(statement)
+
+    def write_statement(self, node: SyntaxTree.Node) -> None:
+        """Writes the VM code of a statement, unless dead code elimination is
+        on and the statement is unreachable.
+        """
+        if self.reachable or not self.dead_code_elimination:
+            self.statement_writers[type(node)](node)
+
+    def write_do(self, node: SyntaxTree.Do) -> None:
+        self.write_expression(node.call)
+        self.vm.write_pop("temp", 0)
+
+    def write_let(self, node: SyntaxTree.Let) -> None:
+        if node.index is not None:
+            self.write_expression(node.index)
+            self.write_expression(node.variable)
+            self.vm.write_arithmetic("ADD")
+            self.write_expression(node.value)
             self.vm.write_pop("temp", 0)
             self.vm.write_pop("pointer", 1)
             self.vm.write_push("temp", 0)
             self.vm.write_pop("that", 0)
         else:
-            self.vm.write_pop(self.kind_map[self.symbol_table.kind_of(name)], self.symbol_table.index_of(name))
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</letStatement>\n")
-
-    def compile_while(self) -> None:
-        """Compiles a while statement."""
-        #self.o.write("  " * self.num_tabs + "<whileStatement>\n")
-        self.num_tabs += 1
+            self.write_expression(node.value)
+            self.vm.write_pop(node.variable.segment, node.variable.index)
+
+    def write_while(self, node: SyntaxTree.While) -> None:
+        constant = self.dead_code_elimination \
+            and type(node.condition) is SyntaxTree.Constant
+        if constant and node.condition.value == 0:
+            return
         num_label_while = self.num_label_while
         self.num_label_while += 1
 
         self.vm.write_label("WHILE_EXP" + str(num_label_while))
+        if not constant:
+            self.write_expression(node.condition)
+            self.vm.write_arithmetic("NOT")
+            self.vm.write_if("WHILE_END" + str(num_label_while))
+        self.write_statements(node.statements)
+        if self.reachable or not self.dead_code_elimination:
+            self.vm.write_goto("WHILE_EXP" + str(num_label_while))
+        if constant:
+            # An endless loop can only be left by returning.
+            self.reachable = False
+        else:
+            self.vm.write_label("WHILE_END" + str(num_label_while))
+            self.reachable = True
 
-        self.process(["while"])
-        self.process(["("])
-        self.compile_expression()
-        self.process([")"])
-
-        self.vm.write_arithmetic("NOT")
-        self.vm.write_if("WHILE_END" + str(num_label_while))
-
-        self.process(["{"])
-        self.compile_statements()
-        self.process(["}"])
-
-        self.vm.write_goto("WHILE_EXP" + str(num_label_while))
-        self.vm.write_label("WHILE_END" + str(num_label_while))
-
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</whileStatement>\n")
-
-    def compile_return(self) -> None:
-        """Compiles a return statement."""
-        #self.o.write("  " * self.num_tabs + "<returnStatement>\n")
-        self.num_tabs += 1
-
-        self.process(["return"])
-        if self.tokenizer.token_type() != "SYMBOL" or self.tokenizer.symbol() != ";":
-            self.compile_expression()
-        self.process([";"])
-
-        if self.is_void:
-            self.vm.write_push("constant", 0)
-
+    def write_return(self, node: SyntaxTree.Return) -> None:
+        if node.value is not None:
+            self.write_expression(node.value)
         self.vm.write_return()
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</returnStatement>\n")
-
-    def compile_if(self) -> None:
-        """Compiles a if statement, possibly with a trailing else clause."""
-        #self.o.write("  " * self.num_tabs + "<ifStatement>\n")
-        self.num_tabs += 1
+        self.reachable = False
+
+    def write_if(self, node: SyntaxTree.If) -> None:
+        if self.dead_code_elimination and type(node.condition) is SyntaxTree.Constant:
+            # Only the branch that is taken is written, without any jumps.
+            if node.condition.value != 0:
+                self.write_statements(node.statements)
+            elif node.else_statements is not None:
+                self.write_statements(node.else_statements)
+            return
         num_label_if = self.num_label_if
         self.num_label_if += 1
 
-        self.process(["if"])
-        self.process(["("])
-        self.compile_expression()
-        self.process([")"])
-
+        self.write_expression(node.condition)
         self.vm.write_if("IF_TRUE" + str(num_label_if))
         self.vm.write_goto("IF_FALSE" + str(num_label_if))
         self.vm.write_label("IF_TRUE" + str(num_label_if))
+        self.write_statements(node.statements)
 
-        self.process(["{"])
-        self.compile_statements()
-        self.process(["}"])
-
-        if self.tokenizer.token_type() == "KEYWORD" and self.tokenizer.keyword() == "ELSE":
-            self.vm.write_goto("IF_END" + str(num_label_if))
+        if node.else_statements is not None:
+            # The end label is only needed if the true branch reaches it.
+            ends = self.reachable or not self.dead_code_elimination
+            if ends:
+                self.vm.write_goto("IF_END" + str(num_label_if))
             self.vm.write_label("IF_FALSE" + str(num_label_if))
-            self.process(["else"])
-            self.process(["{"])
-            self.compile_statements()
-            self.process(["}"])
-            self.vm.write_label("IF_END" + str(num_label_if))
+            self.reachable = True
+            self.write_statements(node.else_statements)
+            if ends:
+                self.vm.write_label("IF_END" + str(num_label_if))
+                self.reachable = True
         else:
             self.vm.write_label("IF_FALSE" + str(num_label_if))
+            self.reachable = True
 
+    def write_expression(self, node: SyntaxTree.Node) -> None:
+        """Writes the VM code evaluating an expression onto the stack."""
+        self.expression_writers[type(node)](node)
 
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</ifStatement>\n")
-
-    def compile_expression(self) -> None:
-        """Compiles an expression. """
-        #self.o.write("  " * self.num_tabs + "<expression>\n")
-        self.num_tabs += 1
+    def write_constant(self, node: SyntaxTree.Constant) -> None:
+        if node.value >= 0:
+            self.vm.write_push("constant", node.value)
+        else:
+            # Only non-negative constants can be pushed, -1 being ~0 etc'.
+            self.vm.write_push("constant", ~node.value)
+            self.vm.write_arithmetic("NOT")
+
+    def write_string_constant(self, node: SyntaxTree.StringConstant) -> None:
+        if not self.string_pool:
+            self.write_new_string(node.value)
+            return
+        index = self.strings.get(node.value)
+        if index is None:
+            index = self.symbol_table.var_count("STATIC") + len(self.strings)
+            self.strings[node.value] = index
+        # The pool is built on first use, when its statics are still null.
+        label = "STRING_READY" + str(self.num_label_string)
+        self.num_label_string += 1
+        self.vm.write_push("static", index)
+        self.vm.write_if(label)
+        self.vm.write_call(self.class_name + ".:strings", 0)
+        self.vm.write_pop("temp", 0)
+        self.vm.write_label(label)
+        self.vm.write_push("static", index)
+
+    def write_new_string(self, value: str) -> None:
+        self.vm.write_push("constant", len(value))
+        self.vm.write_call("String.new", 1)
+        for ch in value:
+            self.vm.write_push("constant", ord(ch))
+            self.vm.write_call("String.appendChar", 2)
+
+    def write_string_pool(self) -> None:
+        """Writes the function building the pooled string literals of the
+        class into their static variables, if the class has any. Its name
+        contains a colon, which no Jack subroutine name can.
+        """
+        if not self.strings:
+            return
+        self.vm.write_function(self.class_name + ".:strings", 0)
+        for value, index in self.strings.items():
+            self.write_new_string(value)
+            self.vm.write_pop("static", index)
+        self.vm.write_push("constant", 0)
+        self.vm.write_return()
 
-        self.compile_term()
-        while self.tokenizer.token_type() == "SYMBOL"  \
-                and self.tokenizer.symbol() in ["+", "-", "*", "/", "&amp;", "|", "&lt;", "&gt;", "="]:
-            og_op = self.process(["+", "-", "*", "/", "&amp;", "|", "&lt;", "&gt;", "="])
-            self.compile_term()
-            if og_op not in ["*", "/", "-"]:
-                self.vm.write_arithmetic(self.op_map[og_op])
-            elif og_op == "-":
+    def write_this(self, node: SyntaxTree.This) -> None:
+        self.vm.write_push("pointer", 0)
+
+    def write_variable(self, node: SyntaxTree.Variable) -> None:
+        self.vm.write_push(node.segment, node.index)
+
+    def write_array_element(self, node: SyntaxTree.ArrayElement) -> None:
+        self.write_expression(node.index)
+        self.write_expression(node.array)
+        self.vm.write_arithmetic("ADD")
+        self.vm.write_pop("pointer", 1)
+        self.vm.write_push("that", 0)
+
+    def write_call(self, node: SyntaxTree.Call) -> None:
+        for argument in node.arguments:
+            self.write_expression(argument)
+        self.vm.write_call(node.name, len(node.arguments))
+
+    def write_inline(self, node: SyntaxTree.Inline) -> None:
+        self.write_statements(node.statements)
+        self.write_expression(node.value)
+
+    def write_unary_op(self, node: SyntaxTree.UnaryOp) -> None:
+        self.write_expression(node.operand)
+        self.vm.write_arithmetic(self.op_map[node.op])
+
+    def write_binary_op(self, node: SyntaxTree.BinaryOp) -> None:
+        # Long chains like a + b + c + ... nest to the left, walk them in a
+        # loop rather than recursing once per operator.
+        chain = []
+        while type(node) is SyntaxTree.BinaryOp:
+            chain.append(node)
+            node = node.left
+        if self.strength_reduction and chain[-1].op == "*" \
+                and type(node) is SyntaxTree.Constant:
+            # Multiplication commutes, so c * x can be written as x * c.
+            self.write_expression(chain.pop().right)
+            self.write_multiply_by(node.value)
+        else:
+            self.write_expression(node)
+        for node in reversed(chain):
+            if self.strength_reduction and type(node.right) is SyntaxTree.Constant:
+                if node.op == "*":
+                    self.write_multiply_by(node.right.value)
+                    continue
+                if node.op == "/" and self.write_divide_by(node.right.value, node.left):
+                    continue
+            self.write_expression(node.right)
+            if node.op not in ["*", "/", "-"]:
+                self.vm.write_arithmetic(self.op_map[node.op])
+            elif node.op == "-":
                 self.vm.write_arithmetic("SUB")
-            elif og_op == "*":
+            elif node.op == "*":
                 self.vm.write_call("Math.multiply", 2)
             else:
                 self.vm.write_call("Math.divide", 2)
 
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</expression>\n")
+    def write_shifts(self, command: str, count: int) -> None:
+        for _ in range(count):
+            self.vm.write_arithmetic(command)
 
-    def compile_term(self) -> None:
-        """Compiles a term. 
-        This routine is faced with a slight difficulty when
-        trying to decide between some of the alternative parsing rules.
-        Specifically, if the current token is an identifier, the routing must
-        distinguish between a variable, an array entry, and a subroutine call.
-        A single look-ahead token, which may be one of "[", "(", or "." suffices
-        to distinguish between the three possibilities. Any other token is not
-        part of this term and should not be advanced over.
+    def write_multiply_by(self, factor: int) -> None:
+        """Multiplies the value on top of the stack by a constant. Factors of
+        the form +-2^a and +-(2^a +- 2^b) are computed with shifts, adds and
+        subtractions, which are exact modulo 2^16 just like Math.multiply.
+        Any other factor still calls Math.multiply.
         """
-        #self.o.write("  " * self.num_tabs + "<term>\n")
-        self.num_tabs += 1
-
-        if self.tokenizer.token_type() == "INT_CONST":
-            int_const = int(self.process([self.tokenizer.int_val()]))
-            self.vm.write_push("constant", int_const)
-        elif self.tokenizer.token_type() == "STRING_CONST":
-            string_const = self.process([self.tokenizer.string_val()])
-            self.vm.write_push("constant", len(string_const))
-            self.vm.write_call("String.new", 1)
-            for ch in string_const:
-                self.vm.write_push("constant", ord(ch))
-                self.vm.write_call("String.appendChar", 2)
-        elif self.tokenizer.token_type() == "KEYWORD" \
-                and self.tokenizer.keyword() in ["TRUE", "FALSE", "NULL", "THIS"]:
-            const = self.process(["true", "false", "null", "this"])
-            if const in ["false", "null"]:
-                self.vm.write_push("constant", 0)
-            elif const == "true":
-                self.vm.write_push("constant", 0)
-                self.vm.write_arithmetic("NOT")
-            else:
-                self.vm.write_push("pointer", 0)
-        elif self.tokenizer.token_type() == "IDENTIFIER":
-            name = self.process([self.tokenizer.identifier()])
-            if self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == "[":
-                self.process(["["])
-                self.compile_expression()
-                self.process(["]"])
-                self.vm.write_push(self.kind_map[self.symbol_table.kind_of(name)], self.symbol_table.index_of(name))
-                self.vm.write_arithmetic("ADD")
-                self.vm.write_pop("pointer", 1)
-                self.vm.write_push("that", 0)
-            elif self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() in [".", "("]:
-
-                var_cond = True
-                num_args = 0
-                if self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ".":
-                    self.process(["."])
-                    if self.symbol_table.type_of(name) is not None:
-                        function_name = self.symbol_table.type_of(name) + "." + self.process(
-                            [self.tokenizer.identifier()])
-                    else:
-                        var_cond = False
-                        function_name = name + "." + self.process([self.tokenizer.identifier()])
-                else:
-                    function_name = self.class_name + "." + name
-
-                if self.symbol_table.type_of(name) is None:
-                    if function_name[:function_name.index(".")] == self.class_name and var_cond:
-                        num_args += 1
-                        self.vm.write_push("pointer", 0)
-                elif self.symbol_table.kind_of(name) in self.kind_map.keys():
-                    self.vm.write_push(self.kind_map[self.symbol_table.kind_of(name)],
-                                       self.symbol_table.index_of(name))
-                    num_args += 1
-
-                self.process(["("])
-                num_args += self.compile_expression_list()
-                self.process([")"])
-
-                self.vm.write_call(function_name, num_args)
-
-            else:
-                self.vm.write_push(self.kind_map[self.symbol_table.kind_of(name)], self.symbol_table.index_of(name))
-        elif self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.keyword() in ["-", "~"]:
-            op = self.op_map[self.process(["-", "~", "^", "#"])]
-            self.compile_term()
-            self.vm.write_arithmetic(op)
+        magnitude = abs(factor)
+        if magnitude == 0:
+            self.vm.write_push("constant", 0)
+            self.vm.write_arithmetic("AND")
+            return
+        low = (magnitude & -magnitude).bit_length() - 1
+        rest = magnitude - (1 << low)
+        carried = magnitude + (1 << low)
+        if rest == 0:
+            self.write_shifts("SHIFTLEFT", low)
         else:
-            self.process(["("])
-            self.compile_expression()
-            self.process([")"])
-
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</term>\n")
-
-    def compile_expression_list(self) -> int:
-        #self.o.write("  " * self.num_tabs + "<expressionList>\n")
-        self.num_tabs += 1
-        num_args = 0
-
-
-        """Compiles a (possibly empty) comma-separated list of expressions. expressionList"""
-        if self.tokenizer.token_type() != "SYMBOL" or self.tokenizer.symbol() != ")":
-            self.compile_expression()
-            num_args += 1
-
-            while self.tokenizer.token_type() == "SYMBOL" and self.tokenizer.symbol() == ",":
-                self.process([","])
-                self.compile_expression()
-                num_args += 1
-
-        self.num_tabs -= 1
-        #self.o.write("  " * self.num_tabs + "</expressionList>\n")
-
-        return num_args
-
+            # x * (2^a + 2^b) = (x << a) + (x << b), and
+            # x * (2^a - 2^b) = (x << a) - (x << b), with x kept in temp 1.
+            if rest & (rest - 1) == 0:
+                high, combine = rest.bit_length() - 1, "ADD"
+            elif carried & (carried - 1) == 0 and carried < 1 << 16:
+                high, combine = carried.bit_length() - 1, "SUB"
+            else:
+                self.write_constant(SyntaxTree.Constant(factor))
+                self.vm.write_call("Math.multiply", 2)
+                return
+            self.vm.write_pop("temp", 1)
+            self.vm.write_push("temp", 1)
+            self.write_shifts("SHIFTLEFT", high)
+            self.vm.write_push("temp", 1)
+            self.write_shifts("SHIFTLEFT", low)
+            self.vm.write_arithmetic(combine)
+        if factor < 0:
+            self.vm.write_arithmetic("NEG")
+
+    def write_divide_by(self, divisor: int, dividend: SyntaxTree.Node) -> bool:
+        """Divides the value on top of the stack by a constant power of two
+        with shifts, if the dividend is known not to be negative (shifting a
+        negative number rounds down where Math.divide rounds toward zero).
+
+        Returns:
+            bool: True if the division was written, False if it is left to
+            Math.divide.
+        """
+        magnitude = abs(divisor)
+        if magnitude == 0 or magnitude & (magnitude - 1) \
+                or (magnitude > 1 and not SyntaxTree.is_non_negative(dividend)):
+            return False
+        self.write_shifts("SHIFTRIGHT", magnitude.bit_length() - 1)
+        if divisor < 0:
+            self.vm.write_arithmetic("NEG")
+        return True
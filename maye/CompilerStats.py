@@ -0,0 +1,155 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import functools
+import time
+import typing
+
+
+class CompilerStats:
+    """Timings and counters of compiling a file: the seconds spent
+    tokenizing, compiling and writing it, the number of tokens, of symbol
+    table lookups and of VM commands written, by command.
+
+    compile_file() and compile_path() fill one in when given it. Like
+    tracing, the counting is only wired in then (see time_tokenizer(),
+    count_lookups() and count_instructions()), so compiling without
+    statistics costs nothing.
+    """
+
+    # The VM command counted for every writer method but write_arithmetic.
+    commands = {
+        "write_push": "push", "write_pop": "pop", "write_label": "label",
+        "write_goto": "goto", "write_if": "if-goto", "write_call": "call",
+        "write_function": "function", "write_return": "return",
+    }
+
+    def __init__(self, path: str = "") -> None:
+        """
+        Args:
+            path (str): the file the statistics are about.
+        """
+        self.path = path
+        self.tokenize_time = 0.0
+        self.compile_time = 0.0
+        self.write_time = 0.0
+        self.tokens = 0
+        self.symbol_lookups = 0
+        self.instructions = {}
+
+    def time_tokenizer(self, tokenizer) -> None:
+        """Makes a tokenizer add the time spent lexing into these statistics.
+        The tokenizer lexes on demand while the engine compiles, so this time
+        is part of the compiling time too.
+
+        Args:
+            tokenizer (JackTokenizer): the tokenizer, whose chunks generator
+            is wrapped.
+        """
+        chunks = tokenizer.chunks
+
+        def timed():
+            while True:
+                start = time.perf_counter()
+                tokens = next(chunks, None)
+                self.tokenize_time += time.perf_counter() - start
+                if tokens is None:
+                    return
+                yield tokens
+        tokenizer.chunks = timed()
+
+    def count_lookups(self, symbol_table) -> None:
+        """Makes a symbol table count its lookups into these statistics.
+
+        Args:
+            symbol_table (SymbolTable): the table, whose resolve method is
+            wrapped.
+        """
+        resolve = symbol_table.resolve
+
+        @functools.wraps(resolve)
+        def counted(name):
+            self.symbol_lookups += 1
+            return resolve(name)
+        symbol_table.resolve = counted
+
+    def count_instructions(self, vm_writer) -> None:
+        """Makes a VM writer count the commands it writes into these
+        statistics.
+
+        Args:
+            vm_writer (VMWriter): the writer, whose write_* methods are
+            wrapped.
+        """
+        counts = self.instructions
+
+        def counter(method: typing.Callable, command: str) -> typing.Callable:
+            @functools.wraps(method)
+            def counted(*args):
+                counts[command] = counts.get(command, 0) + 1
+                return method(*args)
+            return counted
+
+        for name, command in self.commands.items():
+            setattr(vm_writer, name, counter(getattr(vm_writer, name), command))
+        write_arithmetic = vm_writer.write_arithmetic
+
+        @functools.wraps(write_arithmetic)
+        def counted_arithmetic(command):
+            name = command.lower()
+            counts[name] = counts.get(name, 0) + 1
+            return write_arithmetic(command)
+        vm_writer.write_arithmetic = counted_arithmetic
+
+    def add(self, other: "CompilerStats") -> None:
+        """Adds the timings and counters of another file to these.
+
+        Args:
+            other (CompilerStats): the statistics to add.
+        """
+        self.tokenize_time += other.tokenize_time
+        self.compile_time += other.compile_time
+        self.write_time += other.write_time
+        self.tokens += other.tokens
+        self.symbol_lookups += other.symbol_lookups
+        for command, count in other.instructions.items():
+            self.instructions[command] = self.instructions.get(command, 0) + count
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns:
+            typing.Dict[str, typing.Any]: the statistics, ready for json.dump.
+        """
+        return {
+            "path": self.path,
+            "seconds": {"tokenize": self.tokenize_time,
+                        "compile": self.compile_time, "write": self.write_time},
+            "tokens": self.tokens,
+            "symbol_lookups": self.symbol_lookups,
+            "instructions": dict(sorted(self.instructions.items())),
+            "total_instructions": sum(self.instructions.values()),
+        }
+
+    @classmethod
+    def report(cls, files: typing.Iterable["CompilerStats"]
+               ) -> typing.Dict[str, typing.Any]:
+        """
+        Args:
+            files (typing.Iterable[CompilerStats]): the statistics of files.
+
+        Returns:
+            typing.Dict[str, typing.Any]: the statistics of every file and
+            their total, ready for json.dump.
+        """
+        total = cls()
+        report = {"files": []}
+        for stats in files:
+            total.add(stats)
+            report["files"].append(stats.as_dict())
+        report["total"] = total.as_dict()
+        del report["total"]["path"]
+        return report
@@ -0,0 +1,323 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+import SyntaxTree
+
+
+class Inliner:
+    """
+    A pass for the AST mode of CompilationEngine, replacing calls to small
+    leaf functions and methods of the same class with their bodies.
+
+    A subroutine can be inlined if it is a function or a method, calls
+    nothing, returns only at its very end and has at most threshold syntax
+    tree nodes. Leaves cannot recurse, and inlining never produces new calls
+    to inline, so one walk over the class is enough.
+
+    The callee's locals, and those of its arguments that have to be stored,
+    get fresh locals of the caller. Arguments that are constants or
+    variables of the caller's own frame are used in place when the callee
+    never assigns them. A method's fields are read through its receiver,
+    like array elements, unless the receiver is this. Fresh locals are
+    reused by calls that are not evaluated at the same time.
+    """
+
+    threshold = 16
+
+    def __init__(self, threshold: typing.Optional[int] = None) -> None:
+        """
+        Args:
+            threshold (typing.Optional[int]): the largest number of syntax
+            tree nodes a subroutine may have to be inlined.
+        """
+        if threshold is not None:
+            self.threshold = threshold
+        self.callees = {}
+        self.next_local = 0
+        self.n_locals = 0
+
+    def __call__(self, node: SyntaxTree.Class) -> SyntaxTree.Class:
+        """Inlines the calls in every subroutine of a class.
+
+        Args:
+            node (SyntaxTree.Class): the class, changed in place.
+
+        Returns:
+            SyntaxTree.Class: the class.
+        """
+        self.callees = {subroutine.name: subroutine
+                        for subroutine in node.subroutines
+                        if self.is_inlinable(subroutine)}
+        if not self.callees:
+            return node
+        for subroutine in node.subroutines:
+            self.next_local = self.n_locals = subroutine.n_locals
+            subroutine.statements = self.inline_statements(subroutine.statements)
+            subroutine.n_locals = self.n_locals
+        return node
+
+    def is_inlinable(self, subroutine: SyntaxTree.Subroutine) -> bool:
+        statements = subroutine.statements
+        if subroutine.kind == "constructor" or not statements \
+                or type(statements[-1]) is not SyntaxTree.Return:
+            return False
+        size = 0
+        for node in walk(statements):
+            size += 1
+            node_type = type(node)
+            if node_type is SyntaxTree.Call or node_type is SyntaxTree.Return \
+                    and node is not statements[-1]:
+                return False
+        return size <= self.threshold
+
+    def inline_statements(self, statements: typing.List[SyntaxTree.Node]
+                          ) -> typing.List[SyntaxTree.Node]:
+        result = []
+        for statement in statements:
+            statement_type = type(statement)
+            if statement_type is SyntaxTree.Do:
+                call = self.inline_expression(statement.call)
+                if type(call) is SyntaxTree.Inline:
+                    # The returned value is discarded, and computing it has
+                    # no effect since the callee calls nothing.
+                    result.extend(call.statements)
+                else:
+                    result.append(SyntaxTree.Do(call))
+            elif statement_type is SyntaxTree.Let:
+                if statement.index is not None:
+                    statement.index = self.inline_expression(statement.index)
+                statement.value = self.inline_expression(statement.value)
+                result.append(statement)
+            elif statement_type is SyntaxTree.If:
+                statement.condition = self.inline_expression(statement.condition)
+                statement.statements = self.inline_statements(statement.statements)
+                if statement.else_statements is not None:
+                    statement.else_statements = \
+                        self.inline_statements(statement.else_statements)
+                result.append(statement)
+            elif statement_type is SyntaxTree.While:
+                statement.condition = self.inline_expression(statement.condition)
+                statement.statements = self.inline_statements(statement.statements)
+                result.append(statement)
+            else:
+                if statement.value is not None:
+                    statement.value = self.inline_expression(statement.value)
+                result.append(statement)
+        return result
+
+    def inline_expression(self, node: SyntaxTree.Node) -> SyntaxTree.Node:
+        node_type = type(node)
+        if node_type is SyntaxTree.Call:
+            callee = self.callees.get(node.name)
+            if callee is not None and len(node.arguments) == callee.n_args:
+                return self.inline_call(callee, node.arguments)
+            node.arguments = [self.inline_expression(argument)
+                              for argument in node.arguments]
+        elif node_type is SyntaxTree.BinaryOp:
+            node.left = self.inline_expression(node.left)
+            node.right = self.inline_expression(node.right)
+        elif node_type is SyntaxTree.UnaryOp:
+            node.operand = self.inline_expression(node.operand)
+        elif node_type is SyntaxTree.ArrayElement:
+            node.array = self.inline_expression(node.array)
+            node.index = self.inline_expression(node.index)
+        return node
+
+    def inline_call(self, callee: SyntaxTree.Subroutine,
+                    arguments: typing.List[SyntaxTree.Node]) -> SyntaxTree.Inline:
+        """Builds the body of a callee in place of a call to it.
+
+        Args:
+            callee (SyntaxTree.Subroutine): an inlinable subroutine.
+            arguments (typing.List[SyntaxTree.Node]): the arguments of the
+            call, including the receiver of a method.
+
+        Returns:
+            SyntaxTree.Inline: the body, rewritten to use the caller's frame.
+        """
+        assigned = {node.variable.index for node in walk(callee.statements)
+                    if type(node) is SyntaxTree.Let and node.index is None
+                    and type(node.variable) is SyntaxTree.Variable
+                    and node.variable.segment == "argument"}
+        base = self.next_local
+        stored = [index for index, argument in enumerate(arguments)
+                  if index in assigned or not is_in_frame(argument)]
+        self.next_local += len(stored) + callee.n_locals
+        self.n_locals = max(self.n_locals, self.next_local)
+
+        statements = []
+        parameters = []
+        for index, argument in enumerate(arguments):
+            argument = self.inline_expression(argument)
+            if index in stored:
+                local = SyntaxTree.Variable("local", base + stored.index(index))
+                statements.append(SyntaxTree.Let(local, None, argument))
+                argument = local
+            parameters.append(argument)
+        self.next_local = base
+
+        renaming = Renaming(
+            parameters, base + len(stored),
+            parameters[0] if callee.kind == "method" else SyntaxTree.This())
+        for index in uninitialized_locals(callee.statements):
+            # Locals start out as 0, but the reused ones might not be.
+            statements.append(SyntaxTree.Let(
+                renaming.local(index), None, SyntaxTree.Constant(0)))
+        statements.extend(renaming.statements(callee.statements[:-1]))
+        return SyntaxTree.Inline(
+            statements, renaming.expression(callee.statements[-1].value))
+
+
+class Renaming:
+    """Copies the body of an inlined subroutine, moving its variables into
+    the frame of the caller.
+    """
+
+    def __init__(self, parameters: typing.List[SyntaxTree.Node],
+                 first_local: int, receiver: SyntaxTree.Node) -> None:
+        """
+        Args:
+            parameters (typing.List[SyntaxTree.Node]): what every argument of
+            the callee becomes.
+            first_local (int): the caller's local the callee's local 0 becomes.
+            receiver (SyntaxTree.Node): the object fields belong to.
+        """
+        self.parameters = parameters
+        self.first_local = first_local
+        self.receiver = receiver
+
+    def local(self, index: int) -> SyntaxTree.Variable:
+        return SyntaxTree.Variable("local", self.first_local + index)
+
+    def statements(self, statements: typing.List[SyntaxTree.Node]
+                   ) -> typing.List[SyntaxTree.Node]:
+        result = []
+        for statement in statements:
+            statement_type = type(statement)
+            if statement_type is SyntaxTree.Let:
+                target = self.expression(statement.variable)
+                value = self.expression(statement.value)
+                if statement.index is not None:
+                    result.append(SyntaxTree.Let(
+                        target, self.expression(statement.index), value))
+                elif type(target) is SyntaxTree.ArrayElement:
+                    # A field of another object than this.
+                    result.append(SyntaxTree.Let(target.array, target.index, value))
+                else:
+                    result.append(SyntaxTree.Let(target, None, value))
+            elif statement_type is SyntaxTree.If:
+                result.append(SyntaxTree.If(
+                    self.expression(statement.condition),
+                    self.statements(statement.statements),
+                    None if statement.else_statements is None
+                    else self.statements(statement.else_statements)))
+            else:
+                result.append(SyntaxTree.While(
+                    self.expression(statement.condition),
+                    self.statements(statement.statements)))
+        return result
+
+    def expression(self, node: SyntaxTree.Node) -> SyntaxTree.Node:
+        node_type = type(node)
+        if node_type is SyntaxTree.Variable:
+            if node.segment == "argument":
+                return self.parameters[node.index]
+            if node.segment == "local":
+                return self.local(node.index)
+            if node.segment == "this" and type(self.receiver) is not SyntaxTree.This:
+                return SyntaxTree.ArrayElement(
+                    self.receiver, SyntaxTree.Constant(node.index))
+            return node
+        if node_type is SyntaxTree.This:
+            return self.receiver
+        if node_type is SyntaxTree.ArrayElement:
+            return SyntaxTree.ArrayElement(
+                self.expression(node.array), self.expression(node.index))
+        if node_type is SyntaxTree.UnaryOp:
+            return SyntaxTree.unary(node.op, self.expression(node.operand))
+        if node_type is SyntaxTree.BinaryOp:
+            return SyntaxTree.binary(
+                node.op, self.expression(node.left), self.expression(node.right))
+        return node
+
+
+def walk(statements: typing.List[SyntaxTree.Node]
+         ) -> typing.Iterator[SyntaxTree.Node]:
+    """Yields every node of a list of statements, the statements included.
+
+    Args:
+        statements (typing.List[SyntaxTree.Node]): the statements.
+
+    Returns:
+        typing.Iterator[SyntaxTree.Node]: the nodes, parents first.
+    """
+    stack = list(reversed(statements))
+    while stack:
+        node = stack.pop()
+        yield node
+        children = []
+        node_type = type(node)
+        if node_type is SyntaxTree.Let:
+            children = [node.variable, node.index, node.value]
+        elif node_type is SyntaxTree.If:
+            children = [node.condition] + node.statements \
+                + (node.else_statements or [])
+        elif node_type is SyntaxTree.While:
+            children = [node.condition] + node.statements
+        elif node_type is SyntaxTree.Do:
+            children = [node.call]
+        elif node_type is SyntaxTree.Return:
+            children = [node.value]
+        elif node_type is SyntaxTree.ArrayElement:
+            children = [node.array, node.index]
+        elif node_type is SyntaxTree.Call:
+            children = node.arguments
+        elif node_type is SyntaxTree.UnaryOp:
+            children = [node.operand]
+        elif node_type is SyntaxTree.BinaryOp:
+            children = [node.left, node.right]
+        elif node_type is SyntaxTree.Inline:
+            children = node.statements + [node.value]
+        stack.extend(child for child in reversed(children) if child is not None)
+
+
+def is_in_frame(node: SyntaxTree.Node) -> bool:
+    """Tells whether an argument can be used in place of the parameter it is
+    passed to: a constant, this, or a variable that only the caller's own
+    code can change.
+    """
+    node_type = type(node)
+    return node_type is SyntaxTree.Constant or node_type is SyntaxTree.This \
+        or node_type is SyntaxTree.Variable \
+        and node.segment in ("local", "argument")
+
+
+def uninitialized_locals(statements: typing.List[SyntaxTree.Node]
+                         ) -> typing.List[int]:
+    """Finds the locals a body may read before assigning them. Only plain
+    assignments at the top level of the body count as assigning.
+
+    Args:
+        statements (typing.List[SyntaxTree.Node]): the body.
+
+    Returns:
+        typing.List[int]: the indices of these locals, in order.
+    """
+    assigned = set()
+    uninitialized = []
+    for statement in statements:
+        plain = type(statement) is SyntaxTree.Let and statement.index is None
+        reads = walk([statement.value]) if plain else walk([statement])
+        for node in reads:
+            if type(node) is SyntaxTree.Variable and node.segment == "local" \
+                    and node.index not in assigned \
+                    and node.index not in uninitialized:
+                uninitialized.append(node.index)
+        if plain and statement.variable.segment == "local":
+            assigned.add(statement.variable.index)
+    return uninitialized
@@ -5,49 +5,381 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import json
+import mmap
 import os
 import sys
+import tempfile
+import time
 import typing
+from BinaryVMWriter import BinaryVMWriter
+from BuildCache import BuildCache
 from CompilationEngine import CompilationEngine
+from CompilerStats import CompilerStats
+from Inliner import Inliner
 from JackTokenizer import JackTokenizer
 from SymbolTable import SymbolTable
+from Tracer import Tracer
 from VMWriter import VMWriter
 
 
+# Sources at least this large are memory-mapped and lexed in place.
+MAP_THRESHOLD = 1 << 16
+
+
 def compile_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.Union[typing.TextIO, mmap.mmap],
+        output_file: typing.TextIO,
+        tracer: typing.Optional[Tracer] = None, binary: bool = False,
+        optimizations: typing.Collection[str] = (), ast: bool = False,
+        inline_threshold: typing.Optional[int] = None,
+        stats: typing.Optional[CompilerStats] = None,
+        precedence: bool = False) -> None:
     """Compiles a single file.
 
     Args:
-        input_file (typing.TextIO): the file to compile.
+        input_file (typing.Union[typing.TextIO, mmap.mmap]): the file to
+        compile, or its contents mapped into memory (see open_source()).
         output_file (typing.TextIO): writes all output to this file.
+        tracer (typing.Optional[Tracer]): if given, traces the compilation.
+        binary (bool): whether to write binary VM code (see BinaryVMWriter)
+        to output_file, which must then be a binary stream, instead of text.
+        optimizations (typing.Collection[str]): the names of the
+        CompilationEngine.OPTIMIZATIONS to apply.
+        ast (bool): whether to parse each class into a syntax tree before
+        writing it (see CompilationEngine).
+        inline_threshold (typing.Optional[int]): the size up to which the
+        inline optimization inlines subroutines.
+        stats (typing.Optional[CompilerStats]): if given, the tokenizing and
+        compiling times and the counters are added to it.
+        precedence (bool): whether binary operators bind by precedence
+        instead of applying left to right (see CompilationEngine).
     """
+    start = time.perf_counter()
     tokenizer = JackTokenizer(input_file)
-    compilation_engine = CompilationEngine(tokenizer, output_file)
+    if stats is not None:
+        stats.time_tokenizer(tokenizer)
+    vm_writer = BinaryVMWriter(output_file) if binary else None
+    compilation_engine = CompilationEngine(
+        tokenizer, output_file, tracer, vm_writer, optimizations, ast,
+        inline_threshold=inline_threshold, stats=stats, precedence=precedence)
     compilation_engine.compile_class()
+    if stats is not None:
+        stats.compile_time += time.perf_counter() - start
+        stats.tokens += tokenizer.tokens_amount
+
+
+def write_atomically(path: str, text: typing.Union[str, bytes]) -> None:
+    """Writes a file through a temporary file in the same directory, so that
+    readers see either the old contents or the complete new ones.
+
+    Args:
+        path (str): the file to write.
+        text (typing.Union[str, bytes]): the new contents of the file.
+    """
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor,
+                       'wb' if isinstance(text, bytes) else 'w') as temporary_file:
+            temporary_file.write(text)
+        # mkstemp() creates private files, give it the usual permissions.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_path, 0o666 & ~umask)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def compile_path(input_path: str, output_path: str,
+                 tracer: typing.Optional[Tracer] = None,
+                 stats: typing.Optional[CompilerStats] = None, **options) -> str:
+    """Compiles a single .jack file into a .vm file.
+
+    Args:
+        input_path (str): the file to compile.
+        output_path (str): the file to write, replaced atomically.
+        tracer (typing.Optional[Tracer]): if given, traces the compilation.
+        stats (typing.Optional[CompilerStats]): if given, the timings and
+        counters of the compilation are added to it.
+        options: passed on to compile_file().
+
+    Returns:
+        str: the diagnostics printed while compiling, with an error line
+        appended if the compilation failed.
+    """
+    diagnostics = io.StringIO()
+    output_file = io.BytesIO() if options.get("binary") else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(diagnostics), \
+                open_source(input_path) as input_file:
+            compile_file(input_file, output_file, tracer, stats=stats, **options)
+        start = time.perf_counter()
+        write_atomically(output_path, output_file.getvalue())
+        if stats is not None:
+            stats.write_time += time.perf_counter() - start
+    except Exception as error:
+        diagnostics.write("error: " + type(error).__name__ + ": "
+                          + str(error) + "\n")
+    return diagnostics.getvalue()
+
+
+@contextlib.contextmanager
+def open_source(path: str) -> typing.Iterator[
+        typing.Union[typing.TextIO, mmap.mmap]]:
+    """Opens a source file for JackTokenizer: files of at least MAP_THRESHOLD
+    bytes are memory-mapped, so that they are lexed without reading and
+    decoding them first, and smaller ones are read as text.
+
+    Args:
+        path (str): the file to open.
+
+    Yields:
+        typing.Union[typing.TextIO, mmap.mmap]: the open file or mapping.
+    """
+    if os.path.getsize(path) < MAP_THRESHOLD:
+        with open(path, 'r') as text_file:
+            yield text_file
+    else:
+        with open(path, 'rb') as source_file, mmap.mmap(
+                source_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
 
 
+def measure_path(input_path: str, output_path: str,
+                 tracer: typing.Optional[Tracer] = None,
+                 **options) -> typing.Tuple[str, CompilerStats]:
+    """Like compile_path(), also returning the statistics of the compilation,
+    which a worker process cannot add to an object of its caller.
+    """
+    stats = CompilerStats(input_path)
+    return compile_path(input_path, output_path, tracer, stats, **options), stats
+
+
+def find_sources(
+        root: str, output_root: typing.Optional[str] = None,
+        recursive: bool = False,
+        output_extension: str = ".vm") -> typing.Iterator[typing.Tuple[str, str]]:
+    """Finds the .jack files under a path, yielding each one as soon as it is
+    found. Directories are listed in sorted order, and hidden directories
+    (such as the build cache) are never entered.
+
+    Args:
+        root (str): a .jack file, or a directory of them.
+        output_root (typing.Optional[str]): if given, the outputs mirror the
+        layout of root inside this directory, which is created as needed.
+        Otherwise every output is written next to its source.
+        recursive (bool): whether to descend into subdirectories of root.
+        output_extension (str): the extension of the output files.
+
+    Yields:
+        typing.Tuple[str, str]: the (input, output) paths of each source.
+    """
+    if not os.path.isdir(root):
+        entries = [(root, os.path.basename(root))]
+        root = os.path.dirname(root)
+    else:
+        with os.scandir(root) as scanned:
+            entries = sorted((entry.path, entry.name) for entry in scanned)
+    for path, name in entries:
+        if os.path.isdir(path):
+            if recursive and not name.startswith("."):
+                yield from find_sources(
+                    path, output_root and os.path.join(output_root, name),
+                    recursive, output_extension)
+            continue
+        base, extension = os.path.splitext(name)
+        if extension.lower() != ".jack":
+            continue
+        if output_root is None:
+            yield path, os.path.join(root, base + output_extension)
+        else:
+            os.makedirs(output_root, exist_ok=True)
+            yield path, os.path.join(output_root, base + output_extension)
+
+
+def compile_paths(
+        paths: typing.Iterable[typing.Tuple[str, str]], jobs: int,
+        tracer: typing.Optional[Tracer] = None,
+        cache: typing.Optional[BuildCache] = None,
+        options: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        stats: typing.Optional[typing.List[CompilerStats]] = None) -> bool:
+    """Compiles files, in parallel worker processes if jobs > 1, and reports
+    the diagnostics of each file to stderr in the order the files were given.
+    Each file is handed to a worker as soon as it comes out of paths, so a
+    lazy iterable (such as find_sources()) overlaps the search with the
+    compilation. A file whose output path was already given for another
+    input is reported and not compiled, rather than overwriting that output.
+
+    Args:
+        paths (typing.Iterable[typing.Tuple[str, str]]): (input, output) paths.
+        jobs (int): the number of processes to compile with. Tracing always
+        compiles in this process, one file after the other.
+        tracer (typing.Optional[Tracer]): if given, traces the compilation.
+        cache (typing.Optional[BuildCache]): if given, files whose output is
+        in the cache are not compiled, and new outputs are added to it. It
+        must have been created with the same options.
+        options (typing.Optional[typing.Dict[str, typing.Any]]): passed on
+        to compile_file().
+        stats (typing.Optional[typing.List[CompilerStats]]): if given, the
+        statistics of every compiled file are appended to it, in order.
+
+    Returns:
+        bool: True if no file reported diagnostics and no two files had the
+        same output, False otherwise.
+    """
+    options = options or {}
+    compile_one = compile_path if stats is None else measure_path
+    results = []
+    # The input each output path is written from.
+    sources = {}
+    succeeded = True
+    executor = None
+    try:
+        for input_path, output_path in paths:
+            key = os.path.normcase(output_path)
+            if key in sources:
+                # The same file given twice is only compiled once.
+                if sources[key] != input_path:
+                    succeeded = False
+                    sys.stderr.write(
+                        "{}: not compiled, its output {} is already written "
+                        "from {}\n".format(input_path, output_path, sources[key]))
+                continue
+            sources[key] = input_path
+            if cache is not None and cache.restore(input_path, output_path):
+                continue
+            if tracer is not None or jobs <= 1:
+                if tracer is not None:
+                    tracer.begin_file(input_path)
+                result = compile_one(
+                    input_path, output_path, tracer, **options)
+            else:
+                if executor is None:
+                    executor = concurrent.futures.ProcessPoolExecutor(jobs)
+                result = executor.submit(
+                    compile_one, input_path, output_path, **options)
+            results.append((input_path, output_path, result))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    for input_path, output_path, result in results:
+        if isinstance(result, concurrent.futures.Future):
+            result = result.result()
+        if stats is not None:
+            result, file_stats = result
+            stats.append(file_stats)
+        if result:
+            succeeded = False
+            for line in result.splitlines():
+                sys.stderr.write(input_path + ": " + line + "\n")
+        elif cache is not None:
+            cache.store(input_path, output_path)
+    if cache is not None:
+        cache.save()
+    return succeeded
+
 
 if "__main__" == __name__:
-    # Parses the input path and calls compile_file on each input file.
+    # Parses the input paths and calls compile_file on each input file.
     # This opens both the input and the output files!
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: JackCompiler <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
-    if os.path.isdir(argument_path):
-        files_to_assemble = [
-            os.path.join(argument_path, filename)
-            for filename in os.listdir(argument_path)]
+    parser = argparse.ArgumentParser(
+        prog="JackCompiler", description="Compiles Jack files to VM code.")
+    parser.add_argument(
+        "paths", nargs="+", metavar="path",
+        help="a .jack file or a directory of them")
+    parser.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="also compile the .jack files in subdirectories")
+    parser.add_argument(
+        "-o", "--output", metavar="DIR", default=None,
+        help="write the outputs into DIR, mirroring the layout of each input "
+             "directory, instead of next to their sources")
+    parser.add_argument(
+        "--trace", metavar="FILE", default=None,
+        help="write the consumed tokens and productions to FILE (also set "
+             "by the " + Tracer.environment_variable + " environment variable)")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1, metavar="N",
+        help="compile with N processes (default: the number of CPUs)")
+    parser.add_argument(
+        "--cache", nargs="?", const="", default=None, metavar="DIR",
+        help="skip files that did not change since they were last compiled, "
+             "remembering outputs in DIR (default: " + BuildCache.directory_name
+             + " next to the outputs)")
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="write compact binary VM code (.vmb files) instead of text")
+    parser.add_argument(
+        "--ast", action="store_true",
+        help="parse each class into a syntax tree before generating its code")
+    parser.add_argument(
+        "--precedence", action="store_true",
+        help="bind binary operators by precedence, as in C, instead of "
+             "applying them left to right as Jack does")
+    parser.add_argument(
+        "-O", "--optimize", action="append", default=[], metavar="NAME",
+        choices=CompilationEngine.OPTIMIZATIONS + ("all",),
+        help="apply an optional optimization, can be repeated: "
+             + ", ".join(CompilationEngine.OPTIMIZATIONS) + " or all")
+    parser.add_argument(
+        "--inline-threshold", type=int, default=None, metavar="N",
+        help="with -O inline, inline subroutines of up to N syntax tree nodes "
+             "(default: " + str(Inliner.threshold) + ")")
+    parser.add_argument(
+        "--stats", metavar="FILE", default=None,
+        help="write timings and counters of every compiled file to FILE as "
+             "JSON, or to stdout if FILE is -")
+    args = parser.parse_args()
+    if "all" in args.optimize:
+        args.optimize = CompilationEngine.OPTIMIZATIONS
+    options = {"binary": args.binary, "ast": args.ast,
+               "optimizations": sorted(set(args.optimize)),
+               "inline_threshold": args.inline_threshold,
+               "precedence": args.precedence}
+    if args.trace:
+        tracer = Tracer.open(args.trace)
     else:
-        files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".jack":
-            continue
-        output_path = filename + ".vm"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            compile_file(input_file, output_file)
+        tracer = Tracer.from_environment()
+    argument_paths = [os.path.abspath(path) for path in args.paths]
+    output_root = args.output and os.path.abspath(args.output)
+    jobs = args.jobs
+    if len(argument_paths) == 1 and not os.path.isdir(argument_paths[0]):
+        # A pool is not worth starting for a single file.
+        jobs = 1
+    cache = None
+    if args.cache is not None:
+        if output_root is not None:
+            cache_root = output_root
+        elif os.path.isdir(argument_paths[0]):
+            cache_root = argument_paths[0]
+        else:
+            cache_root = os.path.dirname(argument_paths[0])
+        cache = BuildCache(args.cache or os.path.join(
+            cache_root, BuildCache.directory_name), options)
+    paths = itertools.chain.from_iterable(
+        find_sources(argument_path, output_root, args.recursive,
+                     ".vmb" if args.binary else ".vm")
+        for argument_path in argument_paths)
+    stats = [] if args.stats else None
+    succeeded = compile_paths(paths, jobs, tracer, cache, options, stats)
+    if tracer is not None:
+        tracer.close()
+    if stats is not None:
+        report = json.dumps(CompilerStats.report(stats), indent=1) + "\n"
+        if args.stats == "-":
+            sys.stdout.write(report)
+        else:
+            write_atomically(os.path.abspath(args.stats), report)
+    if not succeeded:
+        sys.exit(1)
@@ -5,9 +5,126 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import enum
+import mmap
+import re
 import typing
 
 
+class Terminal(enum.IntEnum):
+    """What the parser tells tokens apart by: every keyword and symbol, and
+    the kind of any other token. Terminals are small ints, so that the parser
+    compares ints and sets of terminals are bitmasks (see mask()).
+    """
+    CLASS = 0
+    CONSTRUCTOR = 1
+    FUNCTION = 2
+    METHOD = 3
+    FIELD = 4
+    STATIC = 5
+    VAR = 6
+    INT = 7
+    CHAR = 8
+    BOOLEAN = 9
+    VOID = 10
+    TRUE = 11
+    FALSE = 12
+    NULL = 13
+    THIS = 14
+    LET = 15
+    DO = 16
+    IF = 17
+    ELSE = 18
+    WHILE = 19
+    RETURN = 20
+    LEFT_BRACE = 21
+    RIGHT_BRACE = 22
+    LEFT_PAREN = 23
+    RIGHT_PAREN = 24
+    LEFT_BRACKET = 25
+    RIGHT_BRACKET = 26
+    DOT = 27
+    COMMA = 28
+    SEMICOLON = 29
+    PLUS = 30
+    MINUS = 31
+    ASTERISK = 32
+    SLASH = 33
+    AMPERSAND = 34
+    BAR = 35
+    LESS = 36
+    GREATER = 37
+    EQUALS = 38
+    TILDE = 39
+    CARET = 40
+    HASH = 41
+    IDENTIFIER = 42
+    INT_CONST = 43
+    STRING_CONST = 44
+    INVALID = 45
+
+
+def mask(*terminals: Terminal) -> int:
+    """
+    Args:
+        terminals (Terminal): any number of terminals.
+
+    Returns:
+        int: the set of the terminals, as a bitmask.
+    """
+    result = 0
+    for terminal in terminals:
+        result |= 1 << terminal
+    return result
+
+
+class Token:
+    """A single lexed token. Its kind is decided once, when the source is
+    scanned, so the parser never has to classify the same text twice.
+    Tokens are never changed, so equal ones can be shared.
+    """
+    __slots__ = ("kind", "value", "terminal")
+
+    def __init__(self, kind: str, value: typing.Union[str, int],
+                 terminal: Terminal) -> None:
+        """
+        Args:
+            kind (str): "KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST",
+            "STRING_CONST", or "" for text that is not a valid token.
+            value (typing.Union[str, int]): the keyword or symbol as written,
+            the identifier, the integer value, or the string without quotes.
+            terminal (Terminal): the terminal of the token.
+        """
+        self.kind = kind
+        self.value = value
+        self.terminal = terminal
+
+
+class EncodedToken:
+    """A token whose text is kept as the UTF-8 bytes it was lexed from until
+    the parser asks for its value, which is then decoded once. Used for the
+    identifiers and strings of sources lexed in place (see scan_bytes()).
+    """
+    __slots__ = ("kind", "raw", "text", "terminal")
+
+    def __init__(self, kind: str, raw: bytes) -> None:
+        """
+        Args:
+            kind (str): "IDENTIFIER" or "STRING_CONST".
+            raw (bytes): the text, without the quotes of a string.
+        """
+        self.kind = kind
+        self.raw = raw
+        self.text = None
+        self.terminal = Terminal[kind]
+
+    @property
+    def value(self) -> str:
+        if self.text is None:
+            self.text = str(self.raw, "utf-8")
+        return self.text
+
+
 class JackTokenizer:
     """Removes all comments from the input stream and breaks it
     into Jack language tokens, as specified by the Jack grammar.
@@ -103,108 +220,287 @@ class JackTokenizer:
     symbols = {'{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-',
                 '*', '/', '&', '|', '<', '>', '=', '~', '^', '#'}
 
-    def __init__(self, input_stream: typing.TextIO) -> None:
-        """Opens the input stream and gets ready to tokenize it.
+    # Whitespace and comments match without a group, so they come out of
+    # findall() as empty tuples. Strings are tried before comments can start
+    # inside them, since the regex engine scans left to right. A string that
+    # is not closed on its line matches too, without the closing quote, and
+    # is lexed as an invalid token. A comment that is not closed in the text
+    # runs to its end, in the second group.
+    token_pattern = re.compile(r"""
+        \s+ | //[^\n]* | /\*.*?\*/
+        | ("[^"\n]*"?)
+        | (/\*.*)
+        | ([{}()\[\].,;+\-*/&|<>=~^#])
+        | ([^\s{}()\[\].,;+\-*/&|<>=~^#"]+)
+        """, re.VERBOSE | re.DOTALL)
+    # The same, to lex UTF-8 bytes in place. Its \s only matches ASCII
+    # whitespace, so words with other bytes are lexed again as text.
+    token_bytes_pattern = re.compile(token_pattern.pattern.encode(),
+                                     re.VERBOSE | re.DOTALL)
+
+    symbol_terminals = {
+        "{": Terminal.LEFT_BRACE, "}": Terminal.RIGHT_BRACE,
+        "(": Terminal.LEFT_PAREN, ")": Terminal.RIGHT_PAREN,
+        "[": Terminal.LEFT_BRACKET, "]": Terminal.RIGHT_BRACKET,
+        ".": Terminal.DOT, ",": Terminal.COMMA, ";": Terminal.SEMICOLON,
+        "+": Terminal.PLUS, "-": Terminal.MINUS, "*": Terminal.ASTERISK,
+        "/": Terminal.SLASH, "&": Terminal.AMPERSAND, "|": Terminal.BAR,
+        "<": Terminal.LESS, ">": Terminal.GREATER, "=": Terminal.EQUALS,
+        "~": Terminal.TILDE, "^": Terminal.CARET, "#": Terminal.HASH,
+    }
+
+    keyword_names = {keyword: keyword.upper() for keyword in keywords}
+    keyword_tokens = {keyword: Token("KEYWORD", keyword, Terminal[keyword.upper()])
+                      for keyword in keywords}
+    symbol_tokens = {symbol: Token("SYMBOL", symbol, terminal)
+                     for symbol, terminal in symbol_terminals.items()}
+    # How syntax errors spell every terminal.
+    terminal_names = {token.terminal: token.value for token
+                      in list(keyword_tokens.values()) + list(symbol_tokens.values())}
+    terminal_names.update((terminal, terminal.name) for terminal in (
+        Terminal.IDENTIFIER, Terminal.INT_CONST, Terminal.STRING_CONST,
+        Terminal.INVALID))
+    keyword_bytes_tokens = {keyword.encode(): token
+                            for keyword, token in keyword_tokens.items()}
+    symbol_bytes_tokens = {symbol.encode(): token
+                           for symbol, token in symbol_tokens.items()}
+
+    # The number of characters read from the input stream at a time, and the
+    # number of tokens peek() can look ahead.
+    chunk_size = 1 << 12
+    lookahead_size = 2
+
+    def __init__(self, input_stream: typing.Union[
+            typing.TextIO, bytes, mmap.mmap]) -> None:
+        """Opens the input stream and gets ready to tokenize it. Nothing is
+        read until the first token is needed.
 
                 Args:
-                    input_stream (typing.TextIO): input stream.
+                    input_stream (typing.Union[typing.TextIO, bytes, mmap.mmap]):
+                    input stream, or the UTF-8 source itself, such as a
+                    memory-mapped file, which is then lexed in place.
                 """
+        self.source = input_stream
+        if isinstance(input_stream, (bytes, bytearray, mmap.mmap)):
+            self.chunks = self.scan_bytes(input_stream)
+        else:
+            self.chunks = self.scan(input_stream)
+        # The tokens of the chunk being read, from position on.
+        self.buffer = []
+        self.position = 0
 
-        # Your code goes here!
-        # A good place to start is to read all the lines of the input:
-        self.input_lines = input_stream.read()#read the input
-        self.remove_comments()#remove comments - now the input lines are splited list, without comments
-        self.token_list = []
-        for inpt in self.input_lines:
-            self.token_list.extend(self.tokinizer(inpt))
+        # Every word lexed so far, keywords included, by its text. Each
+        # distinct word is classified and gets a token once, so all the
+        # occurrences of an identifier share one token and one string.
+        self.words = dict(self.keyword_tokens)
 
-        self.current_token_index = -1
-        self.tokens_amount = len(self.token_list)
-        self.current_token = ""
-        self.current_token_wraped = ""
+        self.tokens_amount = 0
+        self.current = Token("", "", Terminal.INVALID)
 
-    def tokinizer(self,input_lines):
-        tokens = []
-        current_token = ''
-        in_string = False
-
-        for char in input_lines:
-            if char == '"':
-                if not in_string:
-                    in_string = True
-                    current_token += char
-                else:
-                    current_token += char
-                    tokens.append(current_token)
-                    current_token = ''
-                    in_string = False
-            elif in_string:
-                current_token += char
-            elif char.isspace():
-                if current_token:
-                    tokens.append(current_token)
-                    current_token = ''
-            elif char in self.symbols:
-                if current_token:
-                    tokens.append(current_token)
-                    current_token = ''
-                tokens.append(char)
+    def scan(self, input_stream: typing.TextIO
+             ) -> typing.Iterator[typing.List[Token]]:
+        """Reads the input stream a chunk at a time, and lexes each chunk.
+
+        Only block comments span lines, so a chunk is lexed up to its last
+        line break and the rest is kept for the next one. A chunk without
+        line breaks is lexed up to its last complete token instead (see
+        lex_line()), so that a long line is not kept whole. A comment still
+        open at the end of a chunk is not kept: only its end is looked for in
+        the following chunks.
+
+        Args:
+            input_stream (typing.TextIO): the source of a Jack class.
+
+        Returns:
+            typing.Iterator[typing.List[Token]]: the tokens of every chunk.
+        """
+        pending = ""
+        # The end of the comment open at the end of pending, if any. Only
+        # the last character of a block comment is then kept in pending, as
+        # it may start the */.
+        closing = None
+        while True:
+            chunk = input_stream.read(self.chunk_size)
+            if not chunk:
+                # An unclosed comment at the end of the input ends it.
+                if closing is None:
+                    yield self.lex(pending)[0]
+                return
+            text = pending + chunk
+            if closing is not None:
+                close = text.find(closing)
+                if close < 0:
+                    pending = text[-1:] if closing == "*/" else ""
+                    continue
+                text = text[close + len(closing):]
+                closing = None
+            end = text.rfind("\n") + 1
+            if end:
+                tokens, comment = self.lex(text[:end])
+                pending = comment + text[end:]
             else:
-                current_token += char
-
-        if current_token:
-            tokens.append(current_token)
-
-        return tokens
-
-    def clean_whitespace(self,input_lines):
-        cleaned_lines = []
-
-        # Remove whitespace from each line
-        for line in input_lines:
-            cleaned_line = ''.join(line.split())  # Remove all whitespace characters
-            if cleaned_line:  # If the line is not empty after removing whitespace, add to cleaned lines
-                cleaned_lines.append(cleaned_line)
-
-        return cleaned_lines
-
-
-    def remove_comments(self) -> None:
-        """Removes all comments from the input stream.
-        """
-        index = 0
-        final_text = ""
-        while index < len(self.input_lines):
-            char = self.input_lines[index]
-            if char == "\"":
-                # we are in a string so jump to the end of the string
-                end_string_index = self.input_lines.find("\"", index + 1)
-                # add the string to the final text
-                final_text += self.input_lines[index:end_string_index + 1]
-                # jump to the end of the string
-                index = end_string_index + 1
-            elif char == "/":
-                # if it's a block comment we need to jump to the end of the block comment
-                if self.input_lines[index + 1] == "*":
-                    end_comment_index = self.input_lines.find("*/", index + 1)
-                    # jump to the end of the comment
-                    index = end_comment_index + 2
-                    final_text += " "
-                # if it's a line comment we need to jump to the end of the line
-                elif self.input_lines[index + 1] == "/":
-                    end_line_index = self.input_lines.find("\n", index + 1)
-                    # jump to the end of the line
-                    index = end_line_index + 1
-                    final_text += " "
+                tokens, pending = self.lex_line(text)
+            if pending.startswith("/*") and pending.find("*/", 2) < 0:
+                closing, pending = "*/", pending[2:][-1:]
+            elif pending.startswith("//"):
+                closing, pending = "\n", ""
+            yield tokens
+
+    def scan_bytes(self, source: typing.Union[bytes, mmap.mmap]
+                   ) -> typing.Iterator[typing.List[Token]]:
+        """Lexes a UTF-8 source in place, a chunk at a time, like scan(). The
+        source is never copied or decoded as a whole: the regex hands back
+        the bytes of each word, and identifiers and strings are only decoded
+        when the parser needs them (see EncodedToken).
+
+        Args:
+            source (typing.Union[bytes, mmap.mmap]): the source of a Jack
+            class.
+
+        Returns:
+            typing.Iterator[typing.List[Token]]: the tokens of every chunk.
+        """
+        words = dict(self.keyword_bytes_tokens)
+        symbol_tokens = self.symbol_bytes_tokens
+        size = len(source)
+        start = 0
+        while start < size:
+            end = size
+            if start + self.chunk_size < size:
+                end = source.rfind(b"\n", start, start + self.chunk_size) + 1 \
+                    or source.find(b"\n", start + self.chunk_size) + 1 or size
+            tokens = []
+            for string, comment, symbol, word in \
+                    self.token_bytes_pattern.findall(source, start, end):
+                if symbol:
+                    tokens.append(symbol_tokens[symbol])
+                elif word:
+                    token = words.get(word)
+                    if token is not None:
+                        tokens.append(token)
+                    elif not word.isascii():
+                        tokens.extend(self.lex(str(word, "utf-8"))[0])
+                    elif not word[:1].isdigit() \
+                            and word.replace(b"_", b"").isalnum():
+                        token = words[word] = EncodedToken("IDENTIFIER", word)
+                        tokens.append(token)
+                    else:
+                        token = words[word] = self.classify(word.decode())
+                        tokens.append(token)
+                elif string:
+                    if len(string) > 1 and string.endswith(b'"'):
+                        tokens.append(EncodedToken("STRING_CONST", string[1:-1]))
+                    else:
+                        tokens.append(Token("", string.decode("utf-8"),
+                                            Terminal.INVALID))
+                elif comment:
+                    # The comment is the last match and runs past the chunk;
+                    # its last /* is inside it, so it ends at the next */.
+                    close = source.find(b"*/", source.rfind(b"/*", start, end) + 2)
+                    end = size if close < 0 else close + 2
+            yield tokens
+            start = end
+
+    def lex(self, text: str) -> typing.Tuple[typing.List[Token], str]:
+        """Strips comments, splits the text into tokens and classifies them,
+        all in a single pass.
+
+        Args:
+            text (str): Jack source code.
+
+        Returns:
+            typing.Tuple[typing.List[Token], str]: the tokens of the text, in
+            order, and the comment left open at its end, if any.
+        """
+        words = self.words
+        symbol_tokens = self.symbol_tokens
+        tokens = []
+        for string, comment, symbol, word in self.token_pattern.findall(text):
+            if symbol:
+                tokens.append(symbol_tokens[symbol])
+            elif word:
+                token = words.get(word)
+                if token is None:
+                    token = words[word] = self.classify(word)
+                tokens.append(token)
+            elif string:
+                if len(string) > 1 and string.endswith('"'):
+                    tokens.append(Token("STRING_CONST", string[1:-1],
+                                        Terminal.STRING_CONST))
                 else:
-                    final_text += char
-                    index += 1
-            else:
-                final_text += char
-                index += 1
-        self.input_lines = final_text.splitlines()
+                    # Not closed on its line.
+                    tokens.append(Token("", string, Terminal.INVALID))
+            elif comment:
+                return tokens, comment
+        return tokens, ""
+
+    def lex_line(self, text: str) -> typing.Tuple[typing.List[Token], str]:
+        """Lexes a text without line breaks up to its last complete token, as
+        the text may end in the middle of one. A token is complete once
+        something follows it. Like lex(), in a single pass.
+
+        Args:
+            text (str): Jack source code, without line breaks.
+
+        Returns:
+            typing.Tuple[typing.List[Token], str]: the tokens up to the last
+            complete one, and the rest of the text.
+        """
+        words = self.words
+        symbol_tokens = self.symbol_tokens
+        tokens = []
+        size = len(text)
+        end = 0
+        for match in self.token_pattern.finditer(text):
+            group = match.lastindex
+            # Group 2 is a comment, which may be closed in the rest of the
+            # text, and the last token may go on there: a string is only
+            # unclosed if it runs to the end of the text.
+            if group == 2 or match.end() == size:
+                break
+            end = match.end()
+            if group == 3:
+                tokens.append(symbol_tokens[match.group(3)])
+            elif group == 4:
+                word = match.group(4)
+                token = words.get(word)
+                if token is None:
+                    token = words[word] = self.classify(word)
+                tokens.append(token)
+            elif group == 1:
+                tokens.append(Token("STRING_CONST", match.group(1)[1:-1],
+                                    Terminal.STRING_CONST))
+        return tokens, text[end:]
+
+    def classify(self, word: str) -> Token:
+        """
+        Args:
+            word (str): a word of the source that is not a keyword.
+
+        Returns:
+            Token: an integer constant, an identifier, or an invalid token.
+        """
+        if word.isdigit():
+            if int(word) <= 32767:
+                return Token("INT_CONST", int(word), Terminal.INT_CONST)
+        elif not word[0].isdigit() and word.replace("_", "").isalnum():
+            return Token("IDENTIFIER", word, Terminal.IDENTIFIER)
+        return Token("", word, Terminal.INVALID)
 
+    def fill(self, count: int) -> bool:
+        """Lexes chunks until count tokens past the current one are buffered.
 
+        Returns:
+            bool: False if the input ended first.
+        """
+        while len(self.buffer) - self.position < count:
+            tokens = next(self.chunks, None)
+            if tokens is None:
+                return False
+            self.buffer = self.buffer[self.position:] + tokens
+            self.position = 0
+            self.tokens_amount += len(tokens)
+        return True
 
     def has_more_tokens(self) -> bool:
         """Do we have more tokens in the input?
@@ -212,39 +508,63 @@ class JackTokenizer:
         Returns:
             bool: True if there are more tokens, False otherwise.
         """
-        return (self.current_token_index+1)<self.tokens_amount
+        return self.position < len(self.buffer) or self.fill(1)
 
     def advance(self) -> None:
         """Gets the next token from the input and makes it the current token. 
         This method should be called if has_more_tokens() is true. 
         Initially there is no current token.
         """
-        if self.has_more_tokens():
-            self.current_token_index+=1
-            self.current_token = self.token_list[self.current_token_index]
-            current_token_type = self.token_type()
-
-            if current_token_type == "KEYWORD":
-                self.current_token_wraped = "<keyword> "+self.current_token+" </keyword>"
-            elif current_token_type == "SYMBOL":
-                 self.current_token_wraped = "<symbol> "+ self.fit_to_symbol_to_xml(self.current_token) + " </symbol>"
-            elif current_token_type == "IDENTIFIER":
-                 self.current_token_wraped = "<identifier> "+self.current_token+" </identifier>"
-            elif current_token_type == "INT_CONST":
-                 self.current_token_wraped = "<integerConstant> "+self.current_token+" </integerConstant>"
-            elif current_token_type == "STRING_CONST":
-                 self.current_token_wraped = "<stringConstant> "+self.string_val()+" </stringConstant>"
-
+        if self.position < len(self.buffer) or self.fill(1):
+            self.current = self.buffer[self.position]
+            self.position += 1
 
+    def line(self) -> typing.Optional[int]:
+        """Finds the line of the current token, for diagnostics. Tokens do not
+        keep their lines, so the source is read and lexed again up to it.
 
-    def fit_to_symbol_to_xml(self,symbol):
-        dict = {'<':'&lt;','>':'&gt;','&':'&amp;'}
-        if symbol in dict:
-            return dict[symbol]
-        return symbol
+        Returns:
+            typing.Optional[int]: the line, counted from 1, or None if the
+            source can not be read again (e.g. a pipe).
+        """
+        source = self.source
+        try:
+            if isinstance(source, (bytes, bytearray, mmap.mmap)):
+                text = str(source[:], "utf-8")
+            else:
+                resume = source.tell()
+                source.seek(0)
+                text = source.read()
+                source.seek(resume)
+        except (OSError, ValueError):
+            return None
+        # The tokens up to the current one, which was already taken out of
+        # the buffer.
+        remaining = self.tokens_amount - len(self.buffer) + self.position
+        for match in self.token_pattern.finditer(text):
+            if match.lastindex == 2:
+                break
+            if match.lastindex is not None:
+                remaining -= 1
+                if not remaining:
+                    return text.count("\n", 0, match.start()) + 1
+        return None
+
+    def peek(self, offset: int = 1) -> Token:
+        """
+        Args:
+            offset (int): how many tokens after the current one to look,
+            up to lookahead_size.
 
-    def remove_string_quotes(self,string):
-        return string[1:-1]
+        Returns:
+            Token: that token, or an empty token if the input ends first.
+        """
+        if not 0 < offset <= self.lookahead_size:
+            raise ValueError("can only peek 1 to " + str(self.lookahead_size)
+                             + " tokens ahead")
+        if not self.fill(offset):
+            return Token("", "", Terminal.INVALID)
+        return self.buffer[self.position + offset - 1]
 
     def token_type(self) -> str:
         """
@@ -252,20 +572,46 @@ class JackTokenizer:
             str: the type of the current token, can be
             "KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST", "STRING_CONST"
         """
-        print("current token:",self.current_token)
-        print("")
-        if self.current_token in self.keywords:
-            return 'KEYWORD'
-        elif self.current_token in self.symbols:
-            return 'SYMBOL'
-        elif self.current_token.isdigit() and 0 <= int(self.current_token) <= 32767:
-            return 'INT_CONST'
-        elif self.current_token.startswith('"') and self.current_token.endswith('"') and len(self.current_token) > 1:
-            return 'STRING_CONST'
-        elif not self.current_token[0].isdigit() and self.current_token.replace("_", "").isalnum():
-            return 'IDENTIFIER'
-        else:
-            return ""
+        return self.current.kind
+
+    def terminal(self) -> Terminal:
+        """
+        Returns:
+            Terminal: the terminal of the current token.
+        """
+        return self.current.terminal
+
+    def at(self, terminals: int) -> bool:
+        """
+        Args:
+            terminals (int): a set of terminals, as a bitmask (see mask()).
+
+        Returns:
+            bool: True if the current token is one of them, False otherwise.
+        """
+        return 1 << self.current.terminal & terminals != 0
+
+    @classmethod
+    def spell(cls, terminals: int) -> typing.List[str]:
+        """
+        Args:
+            terminals (int): a set of terminals, as a bitmask (see mask()).
+
+        Returns:
+            typing.List[str]: the terminals as written, or the names of the
+            kinds of tokens, in order.
+        """
+        return [cls.terminal_names[terminal] for terminal in Terminal
+                if 1 << terminal & terminals]
+
+    def token_value(self) -> typing.Union[str, int]:
+        """
+        Returns:
+            typing.Union[str, int]: the current token as the parser sees it:
+            keywords and symbols as written, identifiers, integer values, and
+            strings without their double quotes.
+        """
+        return self.current.value
 
     def keyword(self) -> str:
         """
@@ -276,7 +622,7 @@ class JackTokenizer:
             "BOOLEAN", "CHAR", "VOID", "VAR", "STATIC", "FIELD", "LET", "DO", 
             "IF", "ELSE", "WHILE", "RETURN", "TRUE", "FALSE", "NULL", "THIS"
         """
-        return self.current_token.capitalize()
+        return self.keyword_names[self.current.value]
 
     def symbol(self) -> str:
         """
@@ -287,7 +633,7 @@ class JackTokenizer:
             symbol: '{' | '}' | '(' | ')' | '[' | ']' | '.' | ',' | ';' | '+' | 
               '-' | '*' | '/' | '&' | '|' | '<' | '>' | '=' | '~' | '^' | '#'
         """
-        return self.current_token
+        return self.current.value
 
     def identifier(self) -> str:
         """
@@ -299,7 +645,7 @@ class JackTokenizer:
                   starting with a digit. You can assume keywords cannot be
                   identifiers, so 'self' cannot be an identifier, etc'.
         """
-        return self.current_token
+        return self.current.value
 
     def int_val(self) -> int:
         """
@@ -309,7 +655,7 @@ class JackTokenizer:
             Recall that integerConstant was defined in the grammar like so:
             integerConstant: A decimal number in the range 0-32767.
         """
-        return int(self.current_token)
+        return self.current.value
 
     def string_val(self) -> str:
         """
@@ -320,8 +666,4 @@ class JackTokenizer:
             StringConstant: '"' A sequence of Unicode characters not including 
                       double quote or newline '"'
         """
-        return self.current_token[1:-1]
-
-
-
-
+        return self.current.value
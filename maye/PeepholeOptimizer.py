@@ -0,0 +1,239 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from BinaryVMWriter import Command, replay
+from VMWriter import VMWriter
+
+
+class PeepholeOptimizer:
+    """
+    Sits between a CompilationEngine and a VMWriter, with the same interface
+    as the writer. The commands of a class are collected in memory as tuples
+    (see BinaryVMWriter.Command), and on flush() the commands of every
+    function are rewritten by the peephole passes until none applies any
+    more, then written through the writer.
+
+    The passes, by name:
+    - jumps: "if-goto T, goto F, label T" becomes "not, if-goto F, label T"
+      when the condition is a comparison (or its not), as only true (-1) and
+      false (0) invert with not, a goto to a label holding just another goto
+      is redirected there, and a goto to the label right after it is
+      dropped.
+    - logic: "not, not" is dropped, and an if-goto on a constant becomes a
+      goto or is dropped, e.g. "push constant 0, not, if-goto L" is "goto L".
+    - stack: "push X, pop X" is dropped, and so is "pop temp n, push temp n"
+      when temp n is not read again.
+    - dead: labels nothing jumps to are dropped, and so are the commands
+      following a goto or a return up to the next label.
+    """
+
+    PASSES = ("jumps", "logic", "stack", "dead")
+    # The commands that always push true or false.
+    COMPARISONS = (("eq",), ("lt",), ("gt",))
+
+    def __init__(self, vm_writer: VMWriter,
+                 passes: typing.Optional[typing.Collection[str]] = None) -> None:
+        """
+        Args:
+            vm_writer (VMWriter): the writer the optimized commands are
+            written with, e.g. a VMWriter or a BinaryVMWriter.
+            passes (typing.Optional[typing.Collection[str]]): the names of the
+            PASSES to run, all of them by default.
+        """
+        self.vm = vm_writer
+        self.commands = []
+        self.passes = [getattr(self, name + "_pass")
+                       for name in (self.PASSES if passes is None else passes)]
+
+    def flush(self) -> None:
+        """Optimizes the collected commands and writes them, flushing the
+        writer.
+        """
+        optimized = []
+        start = 0
+        for end in range(1, len(self.commands) + 1):
+            if end == len(self.commands) or self.commands[end][0] == "function":
+                optimized.extend(self.optimize(self.commands[start:end]))
+                start = end
+        self.commands.clear()
+        replay(optimized, self.vm)
+
+    def optimize(self, commands: typing.List[Command]) -> typing.List[Command]:
+        """Runs the passes over the commands of a single function until they
+        stop changing.
+
+        Args:
+            commands (typing.List[Command]): the commands of the function.
+
+        Returns:
+            typing.List[Command]: the optimized commands.
+        """
+        changed = True
+        while changed:
+            changed = False
+            for optimization in self.passes:
+                optimized = optimization(commands)
+                changed = changed or optimized != commands
+                commands = optimized
+        return commands
+
+    def jumps_pass(self, commands: typing.List[Command]) -> typing.List[Command]:
+        targets = {}
+        for position, command in enumerate(commands[:-1]):
+            if command[0] == "label" and commands[position + 1][0] == "goto" \
+                    and commands[position + 1][1] != command[1]:
+                targets[command[1]] = commands[position + 1][1]
+        result = []
+        position = 0
+        while position < len(commands):
+            command = commands[position]
+            name = command[0]
+            if name == "goto" or name == "if-goto":
+                label = command[1]
+                seen = {label}
+                while label in targets and targets[label] not in seen:
+                    label = targets[label]
+                    seen.add(label)
+                command = (name, label)
+            following = commands[position + 1:position + 3]
+            if name == "if-goto" and len(following) == 2 \
+                    and following[0][0] == "goto" \
+                    and following[1] == ("label", command[1]) \
+                    and self.is_boolean(result):
+                result.append(("not",))
+                result.append(("if-goto", following[0][1]))
+                position += 2
+                continue
+            if name == "goto" and following[:1] == [("label", command[1])]:
+                position += 1
+                continue
+            result.append(command)
+            position += 1
+        return result
+
+    def logic_pass(self, commands: typing.List[Command]) -> typing.List[Command]:
+        result = []
+        for command in commands:
+            if command == ("not",) and result and result[-1] == ("not",):
+                result.pop()
+                continue
+            if command[0] == "if-goto":
+                nots = 0
+                while nots < len(result) and result[-1 - nots] == ("not",):
+                    nots += 1
+                constant = result[-1 - nots] if len(result) > nots else None
+                if constant is not None and constant[:2] == ("push", "constant"):
+                    value = constant[2]
+                    for _ in range(nots):
+                        value = ~value
+                    del result[-1 - nots:]
+                    if value:
+                        result.append(("goto", command[1]))
+                    continue
+            result.append(command)
+        return result
+
+    def stack_pass(self, commands: typing.List[Command]) -> typing.List[Command]:
+        result = []
+        for position, command in enumerate(commands):
+            if result and command[0] == "pop" and result[-1][0] == "push" \
+                    and result[-1][1:] == command[1:]:
+                result.pop()
+                continue
+            if result and command[0] == "push" and command[1] == "temp" \
+                    and result[-1] == ("pop",) + command[1:] \
+                    and self.is_dead(commands, position + 1, command):
+                result.pop()
+                continue
+            result.append(command)
+        return result
+
+    def dead_pass(self, commands: typing.List[Command]) -> typing.List[Command]:
+        used = {command[1] for command in commands
+                if command[0] == "goto" or command[0] == "if-goto"}
+        result = []
+        reachable = True
+        for command in commands:
+            name = command[0]
+            if name == "label":
+                if command[1] not in used:
+                    continue
+                reachable = True
+            if reachable or name == "function":
+                result.append(command)
+            if name == "goto" or name == "return":
+                reachable = False
+        return result
+
+    @classmethod
+    def is_boolean(cls, commands: typing.List[Command]) -> bool:
+        """
+        Args:
+            commands (typing.List[Command]): the commands before a condition
+            is popped.
+
+        Returns:
+            bool: True if they end by pushing true or false, so that not
+            negates the condition.
+        """
+        if commands[-1:] == [("not",)]:
+            commands = commands[:-1]
+        return commands[-1:] != [] and commands[-1] in cls.COMPARISONS
+
+    @staticmethod
+    def is_dead(commands: typing.List[Command], position: int,
+                location: Command) -> bool:
+        """Tells whether a temp location is overwritten or forgotten before
+        it is read again, following the code from a position without taking
+        any jump. Calls and returns forget it, since functions never expect
+        the temp segment to survive them.
+
+        Args:
+            commands (typing.List[Command]): the commands of a function.
+            position (int): where to start looking.
+            location (Command): a command accessing the location, e.g.
+            ("push", "temp", 0).
+
+        Returns:
+            bool: True if the location's current value is never read.
+        """
+        for command in commands[position:]:
+            name = command[0]
+            if name in ("call", "return") or command == ("pop",) + location[1:]:
+                return True
+            if name in ("label", "goto", "if-goto") \
+                    or command == ("push",) + location[1:]:
+                return False
+        return True
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.commands.append(("push", segment, index))
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.commands.append(("pop", segment, index))
+
+    def write_arithmetic(self, command: str) -> None:
+        self.commands.append((command.lower(),))
+
+    def write_label(self, label: str) -> None:
+        self.commands.append(("label", label))
+
+    def write_goto(self, label: str) -> None:
+        self.commands.append(("goto", label))
+
+    def write_if(self, label: str) -> None:
+        self.commands.append(("if-goto", label))
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.commands.append(("call", name, n_args))
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.commands.append(("function", name, n_locals))
+
+    def write_return(self) -> None:
+        self.commands.append(("return",))
@@ -8,12 +8,36 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 import typing
 
 
+class SymbolEntry:
+    """The information the symbol table keeps about a single identifier."""
+    __slots__ = ("type", "kind", "index", "resolved")
+
+    def __init__(self, type: str, kind: str, index: int) -> None:
+        """
+        Args:
+            type (str): the type of the identifier.
+            kind (str): the kind of the identifier, can be:
+            "STATIC", "FIELD", "ARG", "VAR".
+            index (int): the running index of the identifier within its kind.
+        """
+        self.type = type
+        self.kind = kind
+        self.index = index
+        self.resolved = (SymbolTable.segments[kind], index, type)
+
+
 class SymbolTable:
     """A symbol table that associates names with information needed for Jack
     compilation: type, kind and running index. The symbol table has two nested
-    scopes (class/subroutine).
+    scopes (class/subroutine). Each scope maps a name to its SymbolEntry, so
+    every lookup is a single dictionary probe per scope.
     """
 
+    # The VM segment holding the variables of each kind.
+    segments = {
+        "VAR": "local", "STATIC": "static", "FIELD": "this", "ARG": "argument"
+    }
+
     def __init__(self) -> None:
         """Creates a new empty symbol table."""
         self.d = dict()
@@ -45,16 +69,16 @@ class SymbolTable:
         """
 
         if kind == "STATIC":
-            self.d[(name, type, kind)] = self.count_static
+            self.d[name] = SymbolEntry(type, kind, self.count_static)
             self.count_static += 1
         elif kind == "FIELD":
-            self.d[(name, type, kind)] = self.count_field
+            self.d[name] = SymbolEntry(type, kind, self.count_field)
             self.count_field += 1
         elif kind == "ARG":
-            self.s[(name, type, kind)] = self.count_arg
+            self.s[name] = SymbolEntry(type, kind, self.count_arg)
             self.count_arg += 1
         elif kind == "VAR":
-            self.s[(name, type, kind)] = self.count_var
+            self.s[name] = SymbolEntry(type, kind, self.count_var)
             self.count_var += 1
         else:
             print("Vardec " + name + ", " + type + ", " + kind + " is invalid!")
@@ -78,26 +102,52 @@ class SymbolTable:
             return self.count_var
         return 0
 
-    def kind_of(self, name: str) -> str:
+    def entry_of(self, name: str) -> typing.Optional[SymbolEntry]:
         """
         Args:
             name (str): name of an identifier.
 
         Returns:
-            str: the kind of the named identifier in the current scope, or None
-            if the identifier is unknown in the current scope.
+            typing.Optional[SymbolEntry]: the entry of the named identifier in
+            the current scope, or None if the identifier is unknown in the
+            current scope. Subroutine variables shadow class variables.
         """
-        for tup in self.s.keys():
-            if tup[0] == name:
-                return tup[2]
+        entry = self.s.get(name)
+        if entry is None:
+            entry = self.d.get(name)
+        return entry
 
-        for tup in self.d.keys():
-            if tup[0] == name:
-                return tup[2]
+    def resolve(self, name: str) -> typing.Optional[typing.Tuple[str, int, str]]:
+        """Resolves an identifier to everything needed to push or pop it.
 
+        Args:
+            name (str): name of an identifier.
 
+        Returns:
+            typing.Optional[typing.Tuple[str, int, str]]: the VM segment,
+            index and type of the named identifier, or None if the identifier
+            is unknown in the current scope (e.g. a class or subroutine name).
+        """
+        entry = self.s.get(name)
+        if entry is None:
+            entry = self.d.get(name)
+            if entry is None:
+                return None
+        return entry.resolved
 
-        return None
+    def kind_of(self, name: str) -> str:
+        """
+        Args:
+            name (str): name of an identifier.
+
+        Returns:
+            str: the kind of the named identifier in the current scope, or None
+            if the identifier is unknown in the current scope.
+        """
+        entry = self.entry_of(name)
+        if entry is None:
+            return None
+        return entry.kind
 
     def type_of(self, name: str) -> str:
         """
@@ -107,17 +157,10 @@ class SymbolTable:
         Returns:
             str: the type of the named identifier in the current scope.
         """
-        for tup in self.s.keys():
-            if tup[0] == name:
-                return tup[1]
-
-        for tup in self.d.keys():
-            if tup[0] == name:
-                return tup[1]
-
-
-
-        return None
+        entry = self.entry_of(name)
+        if entry is None:
+            return None
+        return entry.type
 
     def index_of(self, name: str) -> int:
         """
@@ -127,13 +170,7 @@ class SymbolTable:
         Returns:
             int: the index assigned to the named identifier.
         """
-        for tup in self.s.keys():
-            if tup[0] == name:
-                return self.s[tup]
-
-        for tup in self.d.keys():
-            if tup[0] == name:
-                return self.d[tup]
-
-
-        return None
+        entry = self.entry_of(name)
+        if entry is None:
+            return None
+        return entry.index
@@ -0,0 +1,504 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+
+class Node:
+    """The base of all syntax tree nodes."""
+    __slots__ = ()
+
+
+class Constant(Node):
+    """An integer known at compile time. Also represents true (-1), false and
+    null (0), and the results of folding constant subexpressions.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: int) -> None:
+        """
+        Args:
+            value (int): the value, as a signed 16 bit word.
+        """
+        self.value = value
+
+
+class StringConstant(Node):
+    """A string literal."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        """
+        Args:
+            value (str): the string, without its double quotes.
+        """
+        self.value = value
+
+
+class This(Node):
+    """The keyword constant this."""
+    __slots__ = ()
+
+
+class Variable(Node):
+    """A variable, already resolved to its place in the VM."""
+    __slots__ = ("segment", "index")
+
+    def __init__(self, segment: str, index: int) -> None:
+        """
+        Args:
+            segment (str): the VM segment of the variable.
+            index (int): the index of the variable in the segment.
+        """
+        self.segment = segment
+        self.index = index
+
+
+class ArrayElement(Node):
+    """An array access: array[index]."""
+    __slots__ = ("array", "index")
+
+    def __init__(self, array: Node, index: Node) -> None:
+        """
+        Args:
+            array (Node): the expression holding the base address.
+            index (Node): the index expression.
+        """
+        self.array = array
+        self.index = index
+
+
+class Call(Node):
+    """A subroutine call. For method calls, the object is the first argument.
+    """
+    __slots__ = ("name", "arguments")
+
+    def __init__(self, name: str, arguments: typing.List[Node]) -> None:
+        """
+        Args:
+            name (str): the full name of the subroutine, e.g. "Math.multiply".
+            arguments (typing.List[Node]): the argument expressions.
+        """
+        self.name = name
+        self.arguments = arguments
+
+
+class UnaryOp(Node):
+    """A unary operator applied to a term: -, ~, ^ or #."""
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op: str, operand: Node) -> None:
+        """
+        Args:
+            op (str): the operator symbol.
+            operand (Node): the term it applies to.
+        """
+        self.op = op
+        self.operand = operand
+
+
+class BinaryOp(Node):
+    """A binary operator applied to two expressions."""
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op: str, left: Node, right: Node) -> None:
+        """
+        Args:
+            op (str): the operator symbol.
+            left (Node): the left operand, evaluated first.
+            right (Node): the right operand.
+        """
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Inline(Node):
+    """A call replaced by the body of the subroutine called: statements run
+    for their effect, then the expression the subroutine returned.
+    """
+    __slots__ = ("statements", "value")
+
+    def __init__(self, statements: typing.List[Node], value: Node) -> None:
+        """
+        Args:
+            statements (typing.List[Node]): the body, without its return.
+            value (Node): the returned expression.
+        """
+        self.statements = statements
+        self.value = value
+
+
+class Let(Node):
+    """A let statement: variable = value, or variable[index] = value."""
+    __slots__ = ("variable", "index", "value")
+
+    def __init__(self, variable: Node, index: typing.Optional[Node],
+                 value: Node) -> None:
+        """
+        Args:
+            variable (Node): the Variable assigned to, or with an index, any
+            expression evaluating to the array.
+            index (typing.Optional[Node]): the index expression, or None.
+            value (Node): the assigned expression.
+        """
+        self.variable = variable
+        self.index = index
+        self.value = value
+
+
+class If(Node):
+    """An if statement, possibly with an else clause."""
+    __slots__ = ("condition", "statements", "else_statements")
+
+    def __init__(self, condition: Node, statements: typing.List[Node],
+                 else_statements: typing.Optional[typing.List[Node]]) -> None:
+        """
+        Args:
+            condition (Node): the condition expression.
+            statements (typing.List[Node]): the statements run if it is true.
+            else_statements (typing.Optional[typing.List[Node]]): the
+            statements run if it is false, or None if there is no else.
+        """
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+
+class While(Node):
+    """A while statement."""
+    __slots__ = ("condition", "statements")
+
+    def __init__(self, condition: Node, statements: typing.List[Node]) -> None:
+        """
+        Args:
+            condition (Node): the condition expression.
+            statements (typing.List[Node]): the loop body.
+        """
+        self.condition = condition
+        self.statements = statements
+
+
+class Do(Node):
+    """A do statement, a call whose value is discarded."""
+    __slots__ = ("call",)
+
+    def __init__(self, call: Call) -> None:
+        """
+        Args:
+            call (Call): the call.
+        """
+        self.call = call
+
+
+class Return(Node):
+    """A return statement. Void subroutines return the constant 0."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: typing.Optional[Node]) -> None:
+        """
+        Args:
+            value (typing.Optional[Node]): the returned expression.
+        """
+        self.value = value
+
+
+class Subroutine(Node):
+    """A constructor, function or method."""
+    __slots__ = ("kind", "name", "n_args", "n_locals", "statements")
+
+    def __init__(self, kind: str, name: str, n_args: int, n_locals: int,
+                 statements: typing.List[Node]) -> None:
+        """
+        Args:
+            kind (str): "constructor", "function" or "method".
+            name (str): the full name of the subroutine, e.g. "Main.main".
+            n_args (int): the number of arguments, including this for methods.
+            n_locals (int): the number of local variables.
+            statements (typing.List[Node]): the body.
+        """
+        self.kind = kind
+        self.name = name
+        self.n_args = n_args
+        self.n_locals = n_locals
+        self.statements = statements
+
+
+class Class(Node):
+    """A whole class, as far as code generation is concerned."""
+    __slots__ = ("name", "n_fields", "subroutines")
+
+    def __init__(self, name: str, n_fields: int,
+                 subroutines: typing.List[Subroutine]) -> None:
+        """
+        Args:
+            name (str): the name of the class.
+            n_fields (int): the number of fields, allocated by constructors.
+            subroutines (typing.List[Subroutine]): the subroutines, in order.
+        """
+        self.name = name
+        self.n_fields = n_fields
+        self.subroutines = subroutines
+
+
+def to_word(value: int) -> int:
+    """Wraps an integer around to a signed 16 bit word, like the Hack ALU.
+
+    Args:
+        value (int): any integer.
+
+    Returns:
+        int: the value modulo 2^16, in the range -32768..32767.
+    """
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+def fold_unary(op: str, value: int) -> int:
+    """Computes a unary operator at compile time. Shifting right keeps the
+    sign, like the Hack shiftright command.
+
+    Args:
+        op (str): the operator symbol: -, ~, ^ or #.
+        value (int): the operand, a signed 16 bit word.
+
+    Returns:
+        int: the result, a signed 16 bit word.
+    """
+    if op == "-":
+        return to_word(-value)
+    if op == "~":
+        return ~value
+    if op == "^":
+        return to_word(value << 1)
+    return value >> 1
+
+
+def fold_binary(op: str, left: int, right: int) -> typing.Optional[int]:
+    """Computes a binary operator at compile time, the way the VM commands
+    and Math.multiply/Math.divide compute it at run time.
+
+    Args:
+        op (str): the operator symbol.
+        left (int): the left operand, a signed 16 bit word.
+        right (int): the right operand, a signed 16 bit word.
+
+    Returns:
+        typing.Optional[int]: the result, a signed 16 bit word, or None if it
+        has to be left to run time (division by zero).
+    """
+    if op == "+":
+        return to_word(left + right)
+    if op == "-":
+        return to_word(left - right)
+    if op == "*":
+        return to_word(left * right)
+    if op == "/":
+        if right == 0:
+            return None
+        quotient = abs(left) // abs(right)
+        return to_word(quotient if (left < 0) == (right < 0) else -quotient)
+    if op == "&":
+        return left & right
+    if op == "|":
+        return left | right
+    if op == "<":
+        return -1 if left < right else 0
+    if op == ">":
+        return -1 if left > right else 0
+    return -1 if left == right else 0
+
+
+def unary(op: str, operand: Node) -> Node:
+    """Builds a unary operation, folding it if its operand is a constant.
+
+    Args:
+        op (str): the operator symbol.
+        operand (Node): the term it applies to.
+
+    Returns:
+        Node: a Constant or a UnaryOp.
+    """
+    if type(operand) is Constant:
+        return Constant(fold_unary(op, operand.value))
+    return UnaryOp(op, operand)
+
+
+def binary(op: str, left: Node, right: Node) -> Node:
+    """Builds a binary operation, folding it if both operands are constants.
+
+    Args:
+        op (str): the operator symbol.
+        left (Node): the left operand.
+        right (Node): the right operand.
+
+    Returns:
+        Node: a Constant or a BinaryOp.
+    """
+    if type(left) is Constant and type(right) is Constant:
+        value = fold_binary(op, left.value, right.value)
+        if value is not None:
+            return Constant(value)
+    return BinaryOp(op, left, right)
+
+
+def is_non_negative(node: Node) -> bool:
+    """Tells whether an expression is known never to evaluate to a negative
+    number. False means it may be negative, or that this is not known.
+
+    Args:
+        node (Node): the expression.
+
+    Returns:
+        bool: True if the expression is known to be 0 or more.
+    """
+    node_type = type(node)
+    if node_type is Constant:
+        return node.value >= 0
+    if node_type is BinaryOp:
+        if node.op == "&":
+            return is_non_negative(node.left) or is_non_negative(node.right)
+        if node.op == "|":
+            return is_non_negative(node.left) and is_non_negative(node.right)
+        if node.op == "/" and type(node.right) is Constant:
+            return node.right.value > 0 and is_non_negative(node.left)
+    if node_type is UnaryOp and node.op == "#":
+        return is_non_negative(node.operand)
+    return False
+
+
+# The operators arrange() regroups and reorders freely, being associative and
+# commutative modulo 2^16, with the value that leaves the other operand
+# unchanged. Subtraction joins the chains of addition.
+IDENTITIES = {"+": 0, "*": 1, "&": -1, "|": 0}
+# The values that make the results of these operators constant.
+ABSORBING = {"*": 0, "&": 0, "|": -1}
+# The operator computing the same with its operands swapped.
+SWAPPED = {"+": "+", "*": "*", "&": "&", "|": "|", "=": "=", "<": ">", ">": "<"}
+
+
+def arrange(node: Node) -> Node:
+    """Rearranges an expression to evaluate it more cheaply, without changing
+    its value or the order of its calls. Chains of +/-, *, & and | are
+    regrouped so that all their constants fold into one, applied last, and
+    where no calls are involved, the operand needing the deeper stack is
+    evaluated first, so that fewer values wait on the stack.
+
+    Args:
+        node (Node): the expression, whose subexpressions may be changed.
+
+    Returns:
+        Node: the rearranged expression.
+    """
+    return arranged(node)[0]
+
+
+def arranged(node: Node) -> typing.Tuple[Node, typing.Optional[int]]:
+    """
+    Args:
+        node (Node): an expression.
+
+    Returns:
+        typing.Tuple[Node, typing.Optional[int]]: the rearranged expression,
+        and the depth of stack evaluating it takes, or None if it calls a
+        subroutine (or builds a string), which fixes its place in the order.
+    """
+    node_type = type(node)
+    if node_type is Constant or node_type is Variable or node_type is This:
+        return node, 1
+    if node_type is UnaryOp:
+        operand, depth = arranged(node.operand)
+        return unary(node.op, operand), depth
+    if node_type is ArrayElement:
+        node.array, array_depth = arranged(node.array)
+        node.index, index_depth = arranged(node.index)
+        return node, in_order(index_depth, array_depth)
+    if node_type is Call:
+        node.arguments = [arranged(argument)[0] for argument in node.arguments]
+        return node, None
+    if node_type is not BinaryOp:
+        return node, None
+    if node.op in IDENTITIES or node.op == "-":
+        return arranged_chain(node)
+    left, left_depth = arranged(node.left)
+    right, right_depth = arranged(node.right)
+    if node.op in SWAPPED and left_depth is not None \
+            and right_depth is not None and right_depth > left_depth:
+        node = binary(SWAPPED[node.op], right, left)
+        depth = in_order(right_depth, left_depth)
+    else:
+        node = binary(node.op, left, right)
+        depth = in_order(left_depth, right_depth)
+    return node, 1 if type(node) is Constant else depth
+
+
+def arranged_chain(node: BinaryOp) -> typing.Tuple[Node, typing.Optional[int]]:
+    """Like arranged(), for a chain of one of the IDENTITIES operators (with
+    subtractions, for +). Its operands keep their order, but for the deepest
+    one going first when nothing in the chain calls a subroutine.
+    """
+    family = "+" if node.op == "-" else node.op
+    identity = IDENTITIES[family]
+    constant = identity
+    terms = []
+    # The operands, in order, each negated or not: a - (b - c) is a - b + c.
+    stack = [(node, False)]
+    while stack:
+        operand, negated = stack.pop()
+        if type(operand) is BinaryOp and (operand.op == family or
+                                          family == "+" and operand.op == "-"):
+            stack.append((operand.right, negated != (operand.op == "-")))
+            stack.append((operand.left, negated))
+            continue
+        operand, depth = arranged(operand)
+        if type(operand) is Constant:
+            value = to_word(-operand.value) if negated else operand.value
+            constant = fold_binary(family, constant, value)
+        else:
+            terms.append((negated, operand, depth))
+
+    pure = all(depth is not None for _, _, depth in terms)
+    if not terms or pure and constant == ABSORBING.get(family):
+        return Constant(constant), 1
+    if pure:
+        deepest = max((term for term in terms if not term[0]),
+                      key=lambda term: term[2], default=None)
+        if deepest is not None and deepest is not terms[0] \
+                and (terms[0][0] or deepest[2] > terms[0][2]):
+            terms.remove(deepest)
+            terms.insert(0, deepest)
+
+    negated, result, depth = terms[0]
+    if negated and constant != identity:
+        # There is no positive operand to start from: c - x.
+        result = BinaryOp("-", Constant(constant), result)
+        depth = in_order(1, depth)
+        constant = identity
+    elif negated:
+        result = UnaryOp("-", result)
+    for negated, operand, operand_depth in terms[1:]:
+        result = BinaryOp("-" if negated else family, result, operand)
+        depth = in_order(depth, operand_depth)
+    if constant != identity:
+        if family == "+" and -32768 < constant < 0:
+            result = BinaryOp("-", result, Constant(-constant))
+        else:
+            result = BinaryOp(family, result, Constant(constant))
+        depth = in_order(depth, 1)
+    return result, depth
+
+
+def in_order(first: typing.Optional[int],
+             second: typing.Optional[int]) -> typing.Optional[int]:
+    """
+    Returns:
+        typing.Optional[int]: the depth of stack evaluating two operands one
+        after the other takes, given the depth each one takes, or None if
+        either one is None.
+    """
+    if first is None or second is None:
+        return None
+    return max(first, second + 1)
@@ -0,0 +1,115 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import functools
+import os
+import typing
+
+
+class Tracer:
+    """Streams the tokens and productions seen by a CompilationEngine into a
+    trace file, indented by nesting depth. Tracing is off unless a Tracer is
+    given to the engine, and the engine only wraps its methods when it is, so
+    an untraced compilation pays nothing for it.
+    """
+
+    # Setting this environment variable to a path turns tracing on for the
+    # command line driver, like the --trace flag does.
+    environment_variable = "JACK_TRACE"
+    buffer_size = 1 << 16
+
+    def __init__(self, output_stream: typing.TextIO) -> None:
+        """
+        Args:
+            output_stream (typing.TextIO): the sink trace lines are written to.
+        """
+        self.o = output_stream
+        self.depth = 0
+
+    @classmethod
+    def open(cls, path: str) -> "Tracer":
+        """Creates a tracer writing to a new, buffered file.
+
+        Args:
+            path (str): the path of the trace file.
+
+        Returns:
+            Tracer: the new tracer. Call close() when done.
+        """
+        return cls(open(path, "w", buffering=cls.buffer_size))
+
+    @classmethod
+    def from_environment(cls) -> typing.Optional["Tracer"]:
+        """
+        Returns:
+            typing.Optional[Tracer]: a tracer writing to the file named by
+            JACK_TRACE, or None if the variable is not set.
+        """
+        path = os.environ.get(cls.environment_variable)
+        if not path:
+            return None
+        return cls.open(path)
+
+    def close(self) -> None:
+        """Flushes and closes the trace file."""
+        self.o.close()
+
+    def begin_file(self, path: str) -> None:
+        """Marks the start of a new compilation unit in the trace.
+
+        Args:
+            path (str): the path of the compiled file.
+        """
+        self.depth = 0
+        self.o.write("# " + path + "\n")
+
+    def token(self, token_type: str, value: typing.Union[str, int]) -> None:
+        """Records a token consumed by the parser.
+
+        Args:
+            token_type (str): the type of the token.
+            value (typing.Union[str, int]): the value of the token.
+        """
+        self.o.write("  " * self.depth + token_type + " " + str(value) + "\n")
+
+    def consumer(self, tokenizer, process: typing.Callable) -> typing.Callable:
+        """Wraps the engine's process method so that every token it consumes
+        is traced.
+
+        Args:
+            tokenizer (JackTokenizer): the tokenizer the engine reads from.
+            process (typing.Callable): the bound process method to wrap.
+
+        Returns:
+            typing.Callable: the traced method.
+        """
+        @functools.wraps(process)
+        def traced(s):
+            self.token(tokenizer.token_type(), tokenizer.token_value())
+            return process(s)
+        return traced
+
+    def production(self, name: str, method: typing.Callable) -> typing.Callable:
+        """Wraps a compile_* method so that entering and leaving it is traced.
+
+        Args:
+            name (str): the name to show in the trace.
+            method (typing.Callable): the bound method to wrap.
+
+        Returns:
+            typing.Callable: the traced method.
+        """
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            self.o.write("  " * self.depth + name + " {\n")
+            self.depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                self.o.write("  " * self.depth + "}\n")
+        return traced
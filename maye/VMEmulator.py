@@ -0,0 +1,575 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import array
+import json
+import os
+import sys
+import typing
+import BinaryVMWriter
+
+
+# Decoded instructions are (opcode, a, b) tuples. Labels are not
+# instructions, jumps and calls hold the index of their target instead.
+(PUSH_CONSTANT, PUSH_FIXED, PUSH_SEGMENT, POP_FIXED, POP_SEGMENT, ADD, SUB,
+ NEG, EQ, GT, LT, AND, OR, NOT, SHIFTLEFT, SHIFTRIGHT, GOTO, IF_GOTO, CALL,
+ CALL_NATIVE, FUNCTION, RETURN) = range(22)
+
+ARITHMETIC = {
+    "add": ADD, "sub": SUB, "neg": NEG, "eq": EQ, "gt": GT, "lt": LT,
+    "and": AND, "or": OR, "not": NOT, "shiftleft": SHIFTLEFT,
+    "shiftright": SHIFTRIGHT}
+
+SP, LCL, ARG, THIS, THAT = 0, 1, 2, 3, 4
+TEMP, STATIC, STACK, HEAP, HEAP_END = 5, 16, 256, 2048, 16384
+# The segments addressed through a base pointer, and the fixed ones.
+BASES = {"local": LCL, "argument": ARG, "this": THIS, "that": THAT}
+FIXED = {"temp": TEMP, "pointer": THIS}
+
+
+class VMError(Exception):
+    """Raised when the emulated program fails, e.g. calls Sys.error."""
+
+
+def to_word(value: int) -> int:
+    """Wraps an integer around to a signed 16 bit word."""
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+class VMEmulator:
+    """Runs VM code in Python, to measure what compiled programs cost without
+    the Hack hardware or the official tools.
+
+    The RAM is a flat array('h') laid out like on the Hack platform: the
+    pointers at 0-4, temp at 5-12, statics from 16, the stack from 256 and
+    the heap from 2048. The operating system classes (Math, String, Memory,
+    Array, Output, Sys, and do-nothing Screen and Keyboard) are stubs written
+    in Python that work on this RAM; whatever the program prints is collected
+    in output. Subroutines defined in the loaded code take precedence over
+    the stubs.
+
+    While running, the emulator counts the VM instructions executed, in total
+    and per function (exclusive of callees), and the calls made to every
+    function. Stubs execute no VM instructions; each call is instead charged
+    the rough cost in native_costs, an estimate of what the Jack OS routine
+    takes, so that calling Math.multiply still costs more than a shift.
+    """
+
+    # Rough VM instruction counts of the Jack OS routines, for the profile.
+    native_costs = {
+        "Math.multiply": 200, "Math.divide": 250, "Math.sqrt": 500,
+        "Math.abs": 10, "Math.min": 10, "Math.max": 10,
+        "Memory.alloc": 50, "Memory.deAlloc": 30, "Memory.peek": 5,
+        "Memory.poke": 5, "Array.new": 60, "Array.dispose": 40,
+        "String.new": 80, "String.dispose": 40, "String.length": 5,
+        "String.charAt": 10, "String.setCharAt": 10, "String.appendChar": 20,
+        "String.eraseLastChar": 10, "String.intValue": 150,
+        "String.setInt": 250, "Output.printChar": 300,
+        "Output.printString": 300, "Output.printInt": 600,
+        "Output.println": 50,
+    }
+
+    def __init__(self, files: typing.Dict[str, typing.List[BinaryVMWriter.Command]]
+                 ) -> None:
+        """Loads a program.
+
+        Args:
+            files (typing.Dict[str, typing.List[BinaryVMWriter.Command]]):
+            the commands of each VM file, by file name. Each file has its own
+            static segment.
+        """
+        self.ram = array.array('h', bytes(2 * 32768))
+        self.output = []
+        self.natives = {}
+        for name in dir(self):
+            if name.startswith("os_"):
+                self.natives[name[3:].replace("_", ".", 1)] = getattr(self, name)
+        self.code = []
+        self.function_names = []
+        self.function_of = []
+        self.entries = {}
+        self.decode(files)
+        self.heap_free = [(HEAP, HEAP_END - HEAP)]
+        self.block_sizes = {}
+        self.halted = False
+        self.instructions = 0
+        self.cycles = {}
+        self.calls = {}
+
+    @classmethod
+    def load(cls, path: str) -> "VMEmulator":
+        """Loads a .vm or .vmb file, or all of them in a directory.
+
+        Args:
+            path (str): the file or directory.
+
+        Returns:
+            VMEmulator: an emulator ready to run the program.
+        """
+        if os.path.isdir(path):
+            paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            paths = [path]
+        files = {}
+        for file_path in paths:
+            name, extension = os.path.splitext(os.path.basename(file_path))
+            if extension == ".vm":
+                with open(file_path, 'r') as vm_file:
+                    files[name] = BinaryVMWriter.parse(vm_file.read())
+            elif extension == ".vmb":
+                with open(file_path, 'rb') as vm_file:
+                    files[name] = BinaryVMWriter.load(vm_file.read())
+        return cls(files)
+
+    def decode(self, files: typing.Dict[str, typing.List[BinaryVMWriter.Command]]
+               ) -> None:
+        """Translates the commands into instructions, assigning every file a
+        static segment and resolving labels (which are local to their
+        function) and calls.
+        """
+        static_base = STATIC
+        pending = []
+        for file_name, commands in files.items():
+            statics = [command[2] for command in commands
+                       if command[0] in ("push", "pop") and command[1] == "static"]
+            function = file_name
+            labels = {}
+            jumps = []
+            for command in commands:
+                name = command[0]
+                if name == "function":
+                    self.resolve_labels(labels, jumps)
+                    function, labels, jumps = command[1], {}, []
+                    self.entries[function] = len(self.code)
+                    self.function_names.append(function)
+                    self.emit(FUNCTION, command[2], function)
+                elif name == "label":
+                    labels[command[1]] = len(self.code)
+                elif name in ("goto", "if-goto"):
+                    jumps.append((len(self.code), command[1]))
+                    self.emit(GOTO if name == "goto" else IF_GOTO, None, function)
+                elif name == "call":
+                    pending.append(len(self.code))
+                    self.emit(CALL, command[1], function, command[2])
+                elif name == "return":
+                    self.emit(RETURN, None, function)
+                elif name in ("push", "pop"):
+                    segment, index = command[1], command[2]
+                    if segment == "constant":
+                        self.emit(PUSH_CONSTANT, index, function)
+                        continue
+                    if segment in BASES:
+                        kind, a, b = PUSH_SEGMENT, BASES[segment], index
+                    elif segment == "static":
+                        kind, a, b = PUSH_FIXED, static_base + index, None
+                    else:
+                        kind, a, b = PUSH_FIXED, FIXED[segment] + index, None
+                    if name == "pop":
+                        kind = POP_SEGMENT if kind == PUSH_SEGMENT else POP_FIXED
+                    self.emit(kind, a, function, b)
+                else:
+                    self.emit(ARITHMETIC[name], None, function)
+            self.resolve_labels(labels, jumps)
+            static_base += max(statics, default=-1) + 1
+        for position in pending:
+            opcode, name, n_args = self.code[position]
+            if name in self.entries:
+                self.code[position] = (CALL, self.entries[name], n_args)
+            elif name in self.natives:
+                self.code[position] = (CALL_NATIVE, name, n_args)
+            else:
+                raise VMError("call to undefined function " + name)
+
+    def emit(self, opcode: int, a, function: str, b=None) -> None:
+        self.code.append((opcode, a, b))
+        self.function_of.append(function)
+
+    def resolve_labels(self, labels: typing.Dict[str, int],
+                       jumps: typing.List[typing.Tuple[int, str]]) -> None:
+        for position, label in jumps:
+            if label not in labels:
+                raise VMError("jump to undefined label " + label)
+            self.code[position] = (self.code[position][0], labels[label], None)
+
+    def run(self, entry: typing.Optional[str] = None,
+            max_instructions: typing.Optional[int] = None) -> None:
+        """Runs the program until its entry function returns or it calls
+        Sys.halt.
+
+        Args:
+            entry (typing.Optional[str]): the function to start in. Defaults
+            to Sys.init if the program defines it, and to Main.main otherwise.
+            max_instructions (typing.Optional[int]): stop with a VMError after
+            executing this many instructions.
+        """
+        if entry is None:
+            entry = "Sys.init" if "Sys.init" in self.entries else "Main.main"
+        if entry not in self.entries:
+            raise VMError("no entry function " + entry)
+        ram, code = self.ram, self.code
+        ram[SP] = ram[LCL] = ram[ARG] = STACK
+        ram[THIS] = ram[THAT] = 0
+        # Return addresses live here rather than in RAM, where they would not
+        # fit in 16 bits for large programs; their RAM slot is kept, zeroed.
+        returns = []
+        function = entry
+        cycles, calls = self.cycles, self.calls
+        calls[entry] = calls.get(entry, 0) + 1
+        counted = 0
+        pc = self.entries[entry]
+        steps = 0
+        limit = max_instructions if max_instructions is not None else -1
+        while True:
+            opcode, a, b = code[pc]
+            pc += 1
+            steps += 1
+            if steps == limit:
+                self.instructions += steps
+                raise VMError("instruction limit reached")
+            if opcode == PUSH_CONSTANT:
+                sp = ram[SP]
+                ram[sp] = a
+                ram[SP] = sp + 1
+            elif opcode == PUSH_SEGMENT:
+                sp = ram[SP]
+                ram[sp] = ram[ram[a] + b]
+                ram[SP] = sp + 1
+            elif opcode == PUSH_FIXED:
+                sp = ram[SP]
+                ram[sp] = ram[a]
+                ram[SP] = sp + 1
+            elif opcode == POP_SEGMENT:
+                sp = ram[SP] - 1
+                ram[SP] = sp
+                ram[ram[a] + b] = ram[sp]
+            elif opcode == POP_FIXED:
+                sp = ram[SP] - 1
+                ram[SP] = sp
+                ram[a] = ram[sp]
+            elif opcode <= SHIFTRIGHT:
+                sp = ram[SP] - 1
+                y = ram[sp]
+                if opcode == NEG:
+                    ram[sp] = to_word(-y)
+                elif opcode == NOT:
+                    ram[sp] = ~y
+                elif opcode == SHIFTLEFT:
+                    ram[sp] = to_word(y << 1)
+                elif opcode == SHIFTRIGHT:
+                    ram[sp] = y >> 1
+                else:
+                    ram[SP] = sp
+                    x = ram[sp - 1]
+                    if opcode == ADD:
+                        ram[sp - 1] = to_word(x + y)
+                    elif opcode == SUB:
+                        ram[sp - 1] = to_word(x - y)
+                    elif opcode == EQ:
+                        ram[sp - 1] = -1 if x == y else 0
+                    elif opcode == GT:
+                        ram[sp - 1] = -1 if x > y else 0
+                    elif opcode == LT:
+                        ram[sp - 1] = -1 if x < y else 0
+                    elif opcode == AND:
+                        ram[sp - 1] = x & y
+                    else:
+                        ram[sp - 1] = x | y
+            elif opcode == GOTO:
+                pc = a
+            elif opcode == IF_GOTO:
+                sp = ram[SP] - 1
+                ram[SP] = sp
+                if ram[sp]:
+                    pc = a
+            elif opcode == FUNCTION:
+                sp = ram[SP]
+                for offset in range(a):
+                    ram[sp + offset] = 0
+                ram[SP] = sp + a
+            elif opcode == CALL:
+                sp = ram[SP]
+                ram[sp] = 0
+                ram[sp + 1] = ram[LCL]
+                ram[sp + 2] = ram[ARG]
+                ram[sp + 3] = ram[THIS]
+                ram[sp + 4] = ram[THAT]
+                ram[ARG] = sp - b
+                ram[LCL] = ram[SP] = sp + 5
+                returns.append((pc, function))
+                cycles[function] = cycles.get(function, 0) + steps - counted
+                counted = steps
+                function = self.function_of[a]
+                calls[function] = calls.get(function, 0) + 1
+                pc = a
+            elif opcode == CALL_NATIVE:
+                sp = ram[SP] - b
+                result = self.natives[a](*ram[sp:sp + b])
+                ram[sp] = to_word(result or 0)
+                ram[SP] = sp + 1
+                calls[a] = calls.get(a, 0) + 1
+                cycles[a] = cycles.get(a, 0) + self.native_costs.get(a, 1)
+                if self.halted:
+                    break
+            else:
+                frame = ram[LCL]
+                arg = ram[ARG]
+                ram[arg] = ram[ram[SP] - 1]
+                ram[SP] = arg + 1
+                ram[THAT] = ram[frame - 1]
+                ram[THIS] = ram[frame - 2]
+                ram[ARG] = ram[frame - 3]
+                ram[LCL] = ram[frame - 4]
+                cycles[function] = cycles.get(function, 0) + steps - counted
+                counted = steps
+                if not returns:
+                    break
+                pc, function = returns.pop()
+        cycles[function] = cycles.get(function, 0) + steps - counted
+        self.instructions += steps
+
+    def result(self) -> int:
+        """
+        Returns:
+            int: the value the entry function returned.
+        """
+        return self.ram[self.ram[SP] - 1]
+
+    def profile(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns:
+            typing.Dict[str, typing.Any]: the total number of VM instructions
+            executed, the estimated total cost including OS stubs, and the
+            calls and cycles of every function, most expensive first.
+        """
+        functions = sorted(self.cycles, key=lambda name: -self.cycles[name])
+        return {
+            "instructions": self.instructions,
+            "cycles": sum(self.cycles.values()),
+            "functions": [
+                {"name": name, "calls": self.calls.get(name, 0),
+                 "cycles": self.cycles[name]} for name in functions],
+        }
+
+    # Memory
+
+    def os_Memory_init(self) -> None:
+        pass
+
+    def os_Memory_alloc(self, size: int) -> int:
+        size = max(size, 1)
+        for position, (base, length) in enumerate(self.heap_free):
+            if length >= size:
+                if length == size:
+                    del self.heap_free[position]
+                else:
+                    self.heap_free[position] = (base + size, length - size)
+                self.block_sizes[base] = size
+                return base
+        raise VMError("out of heap memory")
+
+    def os_Memory_deAlloc(self, base: int) -> None:
+        size = self.block_sizes.pop(base, None)
+        if size is None:
+            raise VMError("deAlloc of unallocated block " + str(base))
+        self.heap_free.append((base, size))
+
+    def os_Memory_peek(self, address: int) -> int:
+        return self.ram[address]
+
+    def os_Memory_poke(self, address: int, value: int) -> None:
+        self.ram[address] = value
+
+    def os_Array_new(self, size: int) -> int:
+        if size <= 0:
+            raise VMError("Array.new with size " + str(size))
+        return self.os_Memory_alloc(size)
+
+    def os_Array_dispose(self, this: int) -> None:
+        self.os_Memory_deAlloc(this)
+
+    # Math
+
+    def os_Math_init(self) -> None:
+        pass
+
+    def os_Math_multiply(self, x: int, y: int) -> int:
+        return x * y
+
+    def os_Math_divide(self, x: int, y: int) -> int:
+        if y == 0:
+            raise VMError("division by zero")
+        quotient = abs(x) // abs(y)
+        return quotient if (x < 0) == (y < 0) else -quotient
+
+    def os_Math_sqrt(self, x: int) -> int:
+        if x < 0:
+            raise VMError("square root of a negative number")
+        return int(x ** 0.5)
+
+    def os_Math_abs(self, x: int) -> int:
+        return abs(x)
+
+    def os_Math_min(self, x: int, y: int) -> int:
+        return min(x, y)
+
+    def os_Math_max(self, x: int, y: int) -> int:
+        return max(x, y)
+
+    # String: [maximum length, length, characters...]
+
+    def string_text(self, this: int) -> str:
+        length = self.ram[this + 1]
+        return "".join(chr(self.ram[this + 2 + i]) for i in range(length))
+
+    def os_String_new(self, max_length: int) -> int:
+        if max_length < 0:
+            raise VMError("String.new with length " + str(max_length))
+        this = self.os_Memory_alloc(2 + max_length)
+        self.ram[this] = max_length
+        self.ram[this + 1] = 0
+        return this
+
+    def os_String_dispose(self, this: int) -> None:
+        self.os_Memory_deAlloc(this)
+
+    def os_String_length(self, this: int) -> int:
+        return self.ram[this + 1]
+
+    def os_String_charAt(self, this: int, index: int) -> int:
+        return self.ram[this + 2 + index]
+
+    def os_String_setCharAt(self, this: int, index: int, char: int) -> None:
+        self.ram[this + 2 + index] = char
+
+    def os_String_appendChar(self, this: int, char: int) -> int:
+        length = self.ram[this + 1]
+        if length >= self.ram[this]:
+            raise VMError("string is full")
+        self.ram[this + 2 + length] = char
+        self.ram[this + 1] = length + 1
+        return this
+
+    def os_String_eraseLastChar(self, this: int) -> None:
+        self.ram[this + 1] = max(self.ram[this + 1] - 1, 0)
+
+    def os_String_intValue(self, this: int) -> int:
+        text = self.string_text(this)
+        digits = text[1:] if text.startswith("-") else text
+        value = 0
+        for char in digits:
+            if not char.isdigit():
+                break
+            value = value * 10 + int(char)
+        return -value if text.startswith("-") else value
+
+    def os_String_setInt(self, this: int, value: int) -> None:
+        text = str(value)
+        for index, char in enumerate(text):
+            self.ram[this + 2 + index] = ord(char)
+        self.ram[this + 1] = len(text)
+
+    def os_String_newLine(self) -> int:
+        return 128
+
+    def os_String_backSpace(self) -> int:
+        return 129
+
+    def os_String_doubleQuote(self) -> int:
+        return 34
+
+    # Output
+
+    def os_Output_init(self) -> None:
+        pass
+
+    def os_Output_moveCursor(self, i: int, j: int) -> None:
+        pass
+
+    def os_Output_printChar(self, char: int) -> None:
+        self.output.append("\n" if char == 128 else chr(char))
+
+    def os_Output_printString(self, string: int) -> None:
+        self.output.append(self.string_text(string))
+
+    def os_Output_printInt(self, value: int) -> None:
+        self.output.append(str(value))
+
+    def os_Output_println(self) -> None:
+        self.output.append("\n")
+
+    def os_Output_backSpace(self) -> None:
+        if self.output:
+            self.output[-1] = self.output[-1][:-1]
+
+    # Sys, Screen and Keyboard
+
+    def os_Sys_init(self) -> None:
+        pass
+
+    def os_Sys_halt(self) -> None:
+        self.halted = True
+
+    def os_Sys_error(self, code: int) -> None:
+        raise VMError("Sys.error " + str(code))
+
+    def os_Sys_wait(self, duration: int) -> None:
+        pass
+
+    def os_Screen_init(self) -> None:
+        pass
+
+    def os_Screen_clearScreen(self) -> None:
+        pass
+
+    def os_Screen_setColor(self, color: int) -> None:
+        pass
+
+    def os_Screen_drawPixel(self, x: int, y: int) -> None:
+        pass
+
+    def os_Screen_drawLine(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        pass
+
+    def os_Screen_drawRectangle(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        pass
+
+    def os_Screen_drawCircle(self, x: int, y: int, r: int) -> None:
+        pass
+
+    def os_Keyboard_init(self) -> None:
+        pass
+
+    def os_Keyboard_keyPressed(self) -> int:
+        return 0
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="VMEmulator",
+        description="Runs compiled VM code and profiles what it costs.")
+    parser.add_argument("path", help="a .vm/.vmb file or a directory of them")
+    parser.add_argument(
+        "--entry", default=None,
+        help="the function to run (default: Sys.init, or else Main.main)")
+    parser.add_argument(
+        "--max-instructions", type=int, default=None, metavar="N",
+        help="stop after executing N VM instructions")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="print the instruction counts and per-function profile as JSON")
+    args = parser.parse_args()
+    emulator = VMEmulator.load(os.path.abspath(args.path))
+    try:
+        emulator.run(args.entry, args.max_instructions)
+    except VMError as error:
+        sys.stdout.write("".join(emulator.output))
+        sys.exit("error: " + str(error))
+    sys.stdout.write("".join(emulator.output))
+    if args.profile:
+        json.dump(emulator.profile(), sys.stderr, indent=1)
+        sys.stderr.write("\n")
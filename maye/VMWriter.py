@@ -11,11 +11,43 @@ import typing
 class VMWriter:
     """
     Writes VM commands into a file. Encapsulates the VM command syntax.
+
+    Commands are collected in memory and written to the output stream in one
+    call when flush() is called, which the engine does once per class, or
+    whenever buffer_size commands have been collected.
     """
 
-    def __init__(self, output_stream: typing.TextIO) -> None:
-        """Creates a new file and prepares it for writing VM commands."""
+    def __init__(self, output_stream: typing.TextIO,
+                 buffer_size: typing.Optional[int] = None) -> None:
+        """Creates a new file and prepares it for writing VM commands.
+
+        Args:
+            output_stream (typing.TextIO): any object with a write(str)
+            method: a file, an io.StringIO, a pipe, etc'.
+            buffer_size (typing.Optional[int]): the number of commands after
+            which the buffer is flushed, or None to only flush on demand.
+        """
         self.o = output_stream
+        self.buffer = []
+        self.buffer_size = buffer_size
+        if buffer_size is None:
+            self.emit = self.buffer.append
+
+    def emit(self, command: str) -> None:
+        """Buffers a single line of VM code.
+
+        Args:
+            command (str): the command, including its line break.
+        """
+        self.buffer.append(command)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered commands to the output stream."""
+        if self.buffer:
+            self.o.write("".join(self.buffer))
+            self.buffer.clear()
 
     def write_push(self, segment: str, index: int) -> None:
         """Writes a VM push command.
@@ -25,7 +57,7 @@ class VMWriter:
             "LOCAL", "STATIC", "THIS", "THAT", "POINTER", "TEMP"
             index (int): the index to push to.
         """
-        self.o.write("push " + segment + " " + str(index) + "\n")
+        self.emit("push " + segment + " " + str(index) + "\n")
 
     def write_pop(self, segment: str, index: int) -> None:
         """Writes a VM pop command.
@@ -35,7 +67,7 @@ class VMWriter:
             "LOCAL", "STATIC", "THIS", "THAT", "POINTER", "TEMP".
             index (int): the index to pop from.
         """
-        self.o.write("pop " + segment + " " + str(index) + "\n")
+        self.emit("pop " + segment + " " + str(index) + "\n")
 
     def write_arithmetic(self, command: str) -> None:
         """Writes a VM arithmetic command.
@@ -44,7 +76,7 @@ class VMWriter:
             command (str): the command to write, can be "ADD", "SUB", "NEG", 
             "EQ", "GT", "LT", "AND", "OR", "NOT", "SHIFTLEFT", "SHIFTRIGHT".
         """
-        self.o.write(command.lower() + "\n")
+        self.emit(command.lower() + "\n")
 
     def write_label(self, label: str) -> None:
         """Writes a VM label command.
@@ -52,7 +84,7 @@ class VMWriter:
         Args:
             label (str): the label to write.
         """
-        self.o.write("label " + label + "\n")
+        self.emit("label " + label + "\n")
 
     def write_goto(self, label: str) -> None:
         """Writes a VM goto command.
@@ -60,7 +92,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.o.write("goto " + label + "\n")
+        self.emit("goto " + label + "\n")
 
     def write_if(self, label: str) -> None:
         """Writes a VM if-goto command.
@@ -68,7 +100,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.o.write("if-goto " + label + "\n")
+        self.emit("if-goto " + label + "\n")
 
     def write_call(self, name: str, n_args: int) -> None:
         """Writes a VM call command.
@@ -77,7 +109,7 @@ class VMWriter:
             name (str): the name of the function to call.
             n_args (int): the number of arguments the function receives.
         """
-        self.o.write("call " + name + " " + str(n_args) + "\n")
+        self.emit("call " + name + " " + str(n_args) + "\n")
 
     def write_function(self, name: str, n_locals: int) -> None:
         """Writes a VM function command.
@@ -86,8 +118,8 @@ class VMWriter:
             name (str): the name of the function.
             n_locals (int): the number of local variables the function uses.
         """
-        self.o.write("function " + name + " " + str(n_locals) + "\n")
+        self.emit("function " + name + " " + str(n_locals) + "\n")
 
     def write_return(self) -> None:
         """Writes a VM return command."""
-        self.o.write("return\n")
+        self.emit("return\n")
@@ -0,0 +1,24 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Benchmarks of the compiler itself. generate builds synthetic Jack classes,
+run times compiling them and compares the results with a stored baseline.
+Run them from the compiler's directory:
+
+    python -m benchmarks.run [--scale NAME] [-O NAME] [--save] [--threshold RATIO]
+
+Timings depend on the machine, so no baseline is shipped. Save one on the
+machine the comparisons run on, before the change to measure, with the
+same -O flags the comparisons will use (a baseline only compares with
+runs of its own optimizations):
+
+    python -m benchmarks.run --save
+    python -m benchmarks.run -O all --baseline baseline-all.json --save
+
+Later runs without --save then fail if a measurement regressed beyond the
+threshold.
+"""
@@ -0,0 +1,110 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+
+# How many times larger each scale makes every workload.
+SCALES = {"small": 1, "medium": 5, "large": 25}
+
+
+def many_fields(scale: int) -> str:
+    """A class with many fields, a constructor setting them all and a method
+    summing them, to stress the symbol table.
+    """
+    names = ["field" + str(i) for i in range(50 * scale)]
+    lines = ["class Fields {"]
+    lines.extend("    field int " + name + ";" for name in names)
+    lines.append("    constructor Fields new(int seed) {")
+    lines.extend("        let " + name + " = seed + " + str(i) + ";"
+                 for i, name in enumerate(names))
+    lines.append("        return this;")
+    lines.append("    }")
+    lines.append("    method int sum() {")
+    lines.append("        var int total;")
+    lines.extend("        let total = total + " + name + ";" for name in names)
+    lines.append("        return total;")
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def nested_expression(depth: int) -> str:
+    expression = "a"
+    for level in range(depth):
+        expression = "(" + expression + [" + b", " * 3", " - c[" + str(level) + "]",
+                                         " & 255", " / 2"][level % 5] + ")"
+    return expression
+
+
+def deep_expressions(scale: int) -> str:
+    """A function full of deeply nested and long flat expressions."""
+    lines = ["class Expressions {",
+             "    function int compute(int a, int b, Array c) {",
+             "        var int x;"]
+    for i in range(10 * scale):
+        lines.append("        let x = " + nested_expression(40) + ";")
+        lines.append("        let x = x" + "".join(
+            " + (a * " + str(j) + ") - b" for j in range(30)) + ";")
+    lines.append("        return x;")
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def long_strings(scale: int) -> str:
+    """A function printing many long string literals."""
+    lines = ["class Strings {", "    function void show() {"]
+    for i in range(10 * scale):
+        text = ("line " + str(i) + " of some long text, ") * 8
+        lines.append("        do Output.printString(\"" + text + "\");")
+        lines.append("        // " + text)
+        lines.append("        /** " + text + " */")
+    lines.append("        return;")
+    lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def many_subroutines(scale: int) -> str:
+    """A class with thousands of small functions calling each other."""
+    lines = ["class Subroutines {", "    static int count;",
+             "    function int f0(int n) { return n; }"]
+    for i in range(1, 200 * scale):
+        lines.append("    function int f" + str(i) + "(int n) {")
+        lines.append("        var int m;")
+        lines.append("        let m = Subroutines.f" + str(i - 1) + "(n + 1);")
+        lines.append("        if (m > 100) { let count = count + 1; }")
+        lines.append("        while (m < 10) { let m = m * 2; }")
+        lines.append("        return m;")
+        lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+WORKLOADS = {
+    "fields": many_fields,
+    "expressions": deep_expressions,
+    "strings": long_strings,
+    "subroutines": many_subroutines,
+}
+
+
+def sources(scales: typing.Iterable[str] = SCALES
+            ) -> typing.Iterator[typing.Tuple[str, str]]:
+    """Generates every workload at the given scales.
+
+    Args:
+        scales (typing.Iterable[str]): names of SCALES.
+
+    Returns:
+        typing.Iterator[typing.Tuple[str, str]]: (name, source) pairs, the
+        name being "workload/scale".
+    """
+    for scale in scales:
+        for workload, generate in WORKLOADS.items():
+            yield workload + "/" + scale, generate(SCALES[scale])
@@ -0,0 +1,237 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from CompilationEngine import CompilationEngine
+from JackCompiler import write_atomically
+from JackTokenizer import JackTokenizer
+from benchmarks import generate
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "baseline.json")
+# The measurements compared with the baseline, lower being better.
+METRICS = ("lex", "lex_bytes", "parse", "write", "peak_memory")
+# Timings closer than this to the baseline, in seconds, are only noise.
+NOISE = 0.001
+
+
+def lex(source: typing.Union[str, bytes]) -> int:
+    """
+    Args:
+        source (typing.Union[str, bytes]): a Jack class, lexed from a text
+        stream if it is a str and in place if it is bytes.
+
+    Returns:
+        int: the number of tokens in it.
+    """
+    tokenizer = JackTokenizer(
+        source if isinstance(source, bytes) else io.StringIO(source))
+    count = 0
+    while tokenizer.has_more_tokens():
+        tokenizer.advance()
+        count += 1
+    return count
+
+
+def compile_source(source: str, optimizations: typing.Collection[str]) -> str:
+    """
+    Args:
+        source (str): a Jack class.
+        optimizations (typing.Collection[str]): passed on to the engine.
+
+    Returns:
+        str: the VM code of the class.
+    """
+    output = io.StringIO()
+    CompilationEngine(JackTokenizer(io.StringIO(source)), output,
+                      optimizations=optimizations).compile_class()
+    return output.getvalue()
+
+
+def lexed_engine(source: str, optimizations: typing.Collection[str]
+                 ) -> CompilationEngine:
+    """Builds an engine whose tokenizer has already lexed the source, since
+    tokenizers otherwise lex while the engine compiles.
+    """
+    tokenizer = JackTokenizer(io.StringIO(source))
+    tokenizer.chunks = iter(list(tokenizer.chunks))
+    return CompilationEngine(tokenizer, io.StringIO(),
+                             optimizations=optimizations)
+
+
+def best_time(function: typing.Callable, repeat: int,
+              prepare: typing.Callable = lambda: None) -> float:
+    """
+    Args:
+        function (typing.Callable): what to time, called with the result of
+        prepare.
+        repeat (int): the number of times to time it.
+        prepare (typing.Callable): called before every timing, untimed.
+
+    Returns:
+        float: the fastest time, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        argument = prepare()
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(source: str, repeat: int = 5,
+            optimizations: typing.Collection[str] = ()) -> typing.Dict[str, typing.Any]:
+    """Measures compiling a source, stage by stage.
+
+    Args:
+        source (str): a Jack class.
+        repeat (int): the number of times to time each stage, keeping the
+        fastest.
+        optimizations (typing.Collection[str]): passed on to the engine.
+
+    Returns:
+        typing.Dict[str, typing.Any]: the seconds spent lexing (from a text
+        stream, and in place from bytes as from a mapped file), parsing and
+        generating code (with the source lexed beforehand) and writing the
+        output file, the peak memory allocated while compiling in bytes, the
+        number of tokens and output bytes, and the optimizations, sorted.
+    """
+    tokens = lex(source)
+    output = compile_source(source, optimizations)
+    lex_time = best_time(lambda _: lex(source), repeat)
+    encoded = source.encode()
+    lex_bytes_time = best_time(lambda _: lex(encoded), repeat)
+    parse_time = best_time(
+        lambda engine: engine.compile_class(), repeat,
+        lambda: lexed_engine(source, optimizations))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "Out.vm")
+        write_time = best_time(lambda _: write_atomically(path, output), repeat)
+    tracemalloc.start()
+    try:
+        compile_source(source, optimizations)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "lex": lex_time, "lex_bytes": lex_bytes_time, "parse": parse_time,
+        "write": write_time, "peak_memory": peak_memory,
+        "tokens": tokens, "output_bytes": len(output),
+        "optimizations": sorted(set(optimizations)),
+    }
+
+
+def compare(results: typing.Dict[str, typing.Dict[str, typing.Any]],
+            baseline: typing.Dict[str, typing.Dict[str, typing.Any]],
+            threshold: float) -> typing.List[str]:
+    """Finds the measurements that regressed. Measurements taken with other
+    optimizations than the stored ones are not comparable, and raise a
+    ValueError.
+
+    Args:
+        results (typing.Dict[str, typing.Dict[str, typing.Any]]): the new
+        measurements, by benchmark name.
+        baseline (typing.Dict[str, typing.Dict[str, typing.Any]]): the
+        stored ones.
+        threshold (float): how much worse than the baseline a measurement may
+        be, e.g. 0.25 for 25%. Timings within NOISE of it always pass.
+
+    Returns:
+        typing.List[str]: a description of every regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and baseline[name].get("optimizations") \
+                != result["optimizations"]:
+            raise ValueError(
+                "{} was measured with optimizations {} but the baseline with {}"
+                ", save the baseline again to compare them".format(
+                    name, result["optimizations"],
+                    baseline[name].get("optimizations", "unknown ones")))
+        for metric in METRICS:
+            old = baseline.get(name, {}).get(metric)
+            if metric != "peak_memory" and old is not None \
+                    and result[metric] - old < NOISE:
+                continue
+            if old and result[metric] > old * (1 + threshold):
+                regressions.append("{}: {} {:.4g} -> {:.4g} (+{:.0%})".format(
+                    name, metric, old, result[metric], result[metric] / old - 1))
+    return regressions
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.run",
+        description="Times compiling synthetic Jack classes and compares the "
+                    "results with a baseline.")
+    parser.add_argument(
+        "--scale", action="append", choices=list(generate.SCALES), default=[],
+        help="run only this scale, can be repeated (default: all)")
+    parser.add_argument(
+        "--repeat", type=int, default=5, metavar="N",
+        help="time every stage N times and keep the fastest (default: 5)")
+    parser.add_argument(
+        "-O", "--optimize", action="append", default=[], metavar="NAME",
+        choices=CompilationEngine.OPTIMIZATIONS + ("all",),
+        help="compile with an optional optimization, can be repeated: "
+             + ", ".join(CompilationEngine.OPTIMIZATIONS) + " or all")
+    parser.add_argument(
+        "--baseline", default=BASELINE_PATH, metavar="FILE",
+        help="the baseline to compare with (default: baseline.json here)")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, metavar="RATIO",
+        help="fail if a measurement is worse than the baseline by more than "
+             "RATIO (default: 0.25)")
+    parser.add_argument(
+        "--save", action="store_true",
+        help="store the results as the new baseline instead of comparing")
+    args = parser.parse_args()
+    if "all" in args.optimize:
+        args.optimize = CompilationEngine.OPTIMIZATIONS
+
+    results = {}
+    for name, source in generate.sources(args.scale or generate.SCALES):
+        result = results[name] = measure(source, args.repeat, args.optimize)
+        print("{:<24} {:>8} tokens  lex {:8.2f}ms  bytes {:8.2f}ms  "
+              "parse {:8.2f}ms  write {:6.2f}ms  peak {:8.1f}KiB".format(
+                  name, result["tokens"], result["lex"] * 1000,
+                  result["lex_bytes"] * 1000, result["parse"] * 1000, result["write"] * 1000,
+                  result["peak_memory"] / 1024))
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        write_atomically(args.baseline, json.dumps(
+            baseline, indent=1, sort_keys=True) + "\n")
+        print("saved the baseline to " + args.baseline)
+    elif not os.path.exists(args.baseline):
+        print("no baseline at " + args.baseline + ", run with --save first")
+    else:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        try:
+            regressions = compare(results, baseline, args.threshold)
+        except ValueError as error:
+            sys.exit("error: " + str(error))
+        for regression in regressions:
+            sys.stderr.write("regression: " + regression + "\n")
+        if regressions:
+            sys.exit(1)
+        print("no regressions beyond {:.0%}".format(args.threshold))
@@ -0,0 +1,53 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+
+Tests of the compiler. Programs are compiled in memory and run on the
+VMEmulator, so that optimized builds can be checked against unoptimized
+ones. Run them from the compiler's directory:
+
+    python -m unittest discover tests
+"""
+import io
+import typing
+import BinaryVMWriter
+from JackCompiler import compile_file
+from VMEmulator import VMEmulator
+
+
+def compile_source(source: str, **options) -> typing.Union[str, bytes]:
+    """
+    Args:
+        source (str): a Jack class.
+        options: passed on to compile_file().
+
+    Returns:
+        typing.Union[str, bytes]: the VM code of the class, binary if the
+        binary option is set.
+    """
+    output = io.BytesIO() if options.get("binary") else io.StringIO()
+    compile_file(io.StringIO(source), output, **options)
+    return output.getvalue()
+
+
+def run(sources: typing.Dict[str, str], **options) -> str:
+    """Compiles a program and runs it from Main.main.
+
+    Args:
+        sources (typing.Dict[str, str]): the Jack classes, by class name.
+        options: passed on to compile_file().
+
+    Returns:
+        str: what the program printed.
+    """
+    files = {}
+    for name, source in sources.items():
+        code = compile_source(source, **options)
+        files[name] = BinaryVMWriter.load(code) if options.get("binary") \
+            else BinaryVMWriter.parse(code)
+    emulator = VMEmulator(files)
+    emulator.run(max_instructions=10 ** 7)
+    return "".join(emulator.output)
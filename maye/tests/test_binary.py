@@ -0,0 +1,63 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import io
+import unittest
+import BinaryVMWriter
+from CompilationEngine import CompilationEngine
+from VMWriter import VMWriter
+from tests import compile_source
+from tests.test_optimizations import ARITHMETIC, CONDITIONS, POINT
+
+
+class BinaryVMWriterTest(unittest.TestCase):
+
+    def commands(self, **options):
+        """
+        Yields:
+            typing.List[BinaryVMWriter.Command]: the commands of every test
+            class, as compiled to text VM code.
+        """
+        for source in (CONDITIONS, ARITHMETIC, POINT):
+            yield BinaryVMWriter.parse(compile_source(source, **options))
+
+    def test_matches_text(self):
+        for options in ({}, {"optimizations": CompilationEngine.OPTIMIZATIONS}):
+            with self.subTest(**options):
+                for source, commands in zip((CONDITIONS, ARITHMETIC, POINT),
+                                            self.commands(**options)):
+                    self.assertEqual(BinaryVMWriter.load(compile_source(
+                        source, binary=True, **options)), commands)
+
+    def test_replay(self):
+        for commands in self.commands():
+            for buffer_size in (None, 1, 7):
+                with self.subTest(buffer_size=buffer_size):
+                    output = io.BytesIO()
+                    BinaryVMWriter.replay(commands, BinaryVMWriter.BinaryVMWriter(
+                        output, buffer_size))
+                    self.assertEqual(BinaryVMWriter.load(output.getvalue()),
+                                     commands)
+            output = io.StringIO()
+            BinaryVMWriter.replay(commands, VMWriter(output))
+            self.assertEqual(BinaryVMWriter.parse(output.getvalue()), commands)
+
+    def test_strings_are_interned(self):
+        output = io.BytesIO()
+        writer = BinaryVMWriter.BinaryVMWriter(output)
+        for _ in range(100):
+            writer.write_call("Math.multiply", 2)
+        writer.flush()
+        self.assertEqual(output.getvalue().count(b"Math.multiply"), 1)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            BinaryVMWriter.load(b"push constant 1\n")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import itertools
+import os
+import tempfile
+import unittest
+from BuildCache import BuildCache
+from JackCompiler import compile_paths, find_sources
+
+
+MAIN = """
+class Main {
+    function void main() { do Output.printInt(Other.value()); return; }
+}
+"""
+
+OTHER = """
+class Other {
+    function int value() { return %d; }
+}
+"""
+
+
+class BuildCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.sources = os.path.join(self.root, "src")
+        os.makedirs(os.path.join(self.sources, "sub"))
+        self.write("Main.jack", MAIN)
+        self.write(os.path.join("sub", "Other.jack"), OTHER % 1)
+
+    def write(self, name, text):
+        with open(os.path.join(self.sources, name), 'w') as source_file:
+            source_file.write(text)
+
+    def build(self, *roots, **options):
+        """Compiles the roots recursively into OUT with a cache.
+
+        Returns:
+            typing.List[str]: the sources that were compiled, not restored.
+        """
+        cache = BuildCache(os.path.join(self.root, "cache"), options)
+        stats = []
+        paths = itertools.chain.from_iterable(
+            find_sources(root, os.path.join(self.root, "OUT"), True)
+            for root in roots or (self.sources,))
+        self.assertTrue(compile_paths(paths, 1, None, cache, options, stats))
+        return sorted(os.path.relpath(file_stats.path, self.sources)
+                      for file_stats in stats)
+
+    def output(self, name):
+        with open(os.path.join(self.root, "OUT", name), 'r') as output_file:
+            return output_file.read()
+
+    def test_unchanged_sources_are_not_compiled(self):
+        self.assertEqual(self.build(),
+                         ["Main.jack", os.path.join("sub", "Other.jack")])
+        output = self.output(os.path.join("sub", "Other.vm"))
+        self.assertEqual(self.build(), [])
+        self.assertEqual(self.output(os.path.join("sub", "Other.vm")), output)
+
+    def test_changed_source_is_compiled(self):
+        self.build()
+        self.write(os.path.join("sub", "Other.jack"), OTHER % 12)
+        self.assertEqual(self.build(), [os.path.join("sub", "Other.jack")])
+        self.assertIn("push constant 12",
+                      self.output(os.path.join("sub", "Other.vm")))
+
+    def test_deleted_output_is_restored(self):
+        self.build()
+        output = self.output("Main.vm")
+        os.remove(os.path.join(self.root, "OUT", "Main.vm"))
+        self.assertEqual(self.build(), [])
+        self.assertEqual(self.output("Main.vm"), output)
+
+    def test_other_options_are_compiled(self):
+        self.build()
+        self.assertEqual(len(self.build(optimizations=["peephole"])), 2)
+
+    def test_source_reached_through_two_roots(self):
+        compiled = self.build(self.sources, os.path.join(self.sources, "sub"))
+        self.assertEqual(compiled.count(os.path.join("sub", "Other.jack")), 2)
+        self.assertEqual(self.output("Other.vm"),
+                         self.output(os.path.join("sub", "Other.vm")))
+        self.assertEqual(
+            self.build(self.sources, os.path.join(self.sources, "sub")), [])
+
+
+if "__main__" == __name__:
+    unittest.main()
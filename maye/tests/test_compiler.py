@@ -0,0 +1,122 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+import unittest
+import JackCompiler
+from JackCompiler import compile_path, compile_paths, find_sources
+
+
+UNDEFINED = """class Main {
+    function void main() {
+        var int y;
+        let y = zz + 1;
+        let w[2] = y;
+        return;
+    }
+}
+"""
+
+
+class DiagnosticsTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def compile(self, source, **options):
+        """
+        Returns:
+            typing.List[str]: the diagnostics of compiling the source.
+        """
+        input_path = os.path.join(self.directory, "Main.jack")
+        with open(input_path, 'w') as input_file:
+            input_file.write(source)
+        return compile_path(input_path, os.path.join(self.directory, "Main.vm"),
+                            **options).splitlines()
+
+    def test_undefined_variables(self):
+        expected = ["line 4: undefined variable 'zz'",
+                    "line 5: undefined variable 'w'"]
+        self.assertEqual(self.compile(UNDEFINED), expected)
+        self.assertEqual(self.compile(UNDEFINED, ast=True), expected)
+
+    def test_unterminated_string(self):
+        source = UNDEFINED.replace("zz + 1", '"never closed')
+        for options in ({}, {"ast": True}, {"binary": True}):
+            with self.subTest(**options):
+                self.assertEqual(self.compile(source, **options)[0],
+                                 "line 4: unterminated string constant")
+
+    def test_undefined_variable_in_mapped_source(self):
+        self.addCleanup(setattr, JackCompiler, "MAP_THRESHOLD",
+                        JackCompiler.MAP_THRESHOLD)
+        JackCompiler.MAP_THRESHOLD = 0
+        self.assertEqual(self.compile("// padding\n" * 100 + UNDEFINED)[0],
+                         "line 104: undefined variable 'zz'")
+
+
+class ProjectTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for root, value in (("a", 1), ("b", 2)):
+            os.makedirs(os.path.join(self.directory, root, "sub"))
+            for name in ("Main.jack", os.path.join("sub", "Main.jack")):
+                with open(os.path.join(self.directory, root, name),
+                          'w') as source_file:
+                    source_file.write("class Main { function int f() "
+                                      "{ return %d; } }" % value)
+
+    def compile(self, roots, jobs=1):
+        """Compiles the roots recursively into OUT.
+
+        Returns:
+            typing.Tuple[bool, str]: whether it succeeded, and its stderr.
+        """
+        paths = itertools.chain.from_iterable(
+            find_sources(os.path.join(self.directory, root),
+                         os.path.join(self.directory, "OUT"), True)
+            for root in roots)
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            succeeded = compile_paths(paths, jobs, options={})
+        return succeeded, errors.getvalue()
+
+    def output(self, name):
+        with open(os.path.join(self.directory, "OUT", name), 'r') as output_file:
+            return output_file.read()
+
+    def test_mirrors_the_layout(self):
+        self.assertEqual(self.compile(["a"]), (True, ""))
+        self.assertIn("push constant 1", self.output("Main.vm"))
+        self.assertIn("push constant 1",
+                      self.output(os.path.join("sub", "Main.vm")))
+
+    def test_refuses_two_sources_with_one_output(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                succeeded, errors = self.compile(["a", "b"], jobs)
+                self.assertFalse(succeeded)
+                self.assertEqual(len(errors.splitlines()), 2)
+                self.assertIn(os.path.join("b", "Main.jack")
+                              + ": not compiled", errors)
+                self.assertIn("push constant 1", self.output("Main.vm"))
+
+    def test_compiles_a_source_given_twice_once(self):
+        self.assertEqual(self.compile(["a", "a"]), (True, ""))
+
+
+if "__main__" == __name__:
+    unittest.main()
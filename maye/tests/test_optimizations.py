@@ -0,0 +1,285 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import unittest
+from CompilationEngine import CompilationEngine
+from PeepholeOptimizer import PeepholeOptimizer
+from tests import compile_source, run
+
+
+# Conditions that are not just true or false, which only if-goto tests
+# correctly: not inverts 4 into -5, which is still true.
+CONDITIONS = """
+class Main {
+    function void main() {
+        var int flags, i, n;
+        let flags = 6;
+        if (flags & 4) { do Output.printString("set"); }
+        else { do Output.printString("clear"); }
+        if (flags & 1) { do Output.printString("set"); }
+        else { do Output.printString("clear"); }
+        if (~(flags = 6)) { do Output.printString("ne"); }
+        else { do Output.printString("eq"); }
+        if (flags) { do Output.printInt(flags); }
+        let i = 3;
+        let n = 0;
+        while (i > 0) { let n = n + i; let i = i - 1; }
+        do Output.printInt(n);
+        while (~(i > 2)) { let i = i + 1; }
+        do Output.printInt(i);
+        do Output.println();
+        return;
+    }
+}
+"""
+
+# Arithmetic for folding and strength reduction, constant conditions and
+# code after return for dead code elimination, string constants in a loop,
+# and small subroutines and methods to inline.
+ARITHMETIC = """
+class Main {
+    static int counter;
+    static boolean DEBUG;
+    function void main() {
+        var int i, j, s;
+        var Array a;
+        var Point p, q;
+        let DEBUG = false;
+        let a = Array.new(10);
+        let i = 0;
+        while (i < 10) { let a[i] = i * 7 - 3; let i = i + 1; }
+        let s = 0;
+        let i = 0;
+        while (i < 10) {
+            let s = s + (a[i] * 3) + (a[i] / 4) - (a[i] * 8) + (a[i] * 10);
+            let i = i + 1;
+        }
+        do Output.printInt(s);
+        do Output.println();
+        let p = Point.new(3, 4);
+        let q = Point.new(-5, 12);
+        do Output.printInt(p.getX() + q.getY());
+        do Output.println();
+        do Output.printInt(p.dist2(q));
+        do Output.println();
+        do p.move(2, -1);
+        do p.pull(q);
+        do Output.printInt(p.getX() + q.getX() + p.twiceAcc());
+        do Output.println();
+        if (true) { do Output.printString("yes"); }
+        else { do Output.printString("no"); }
+        if (false) { do Output.printString("never"); }
+        if (DEBUG) { do Output.printString("debug"); }
+        let j = 0;
+        while (true) {
+            let j = j + 1;
+            if (j > 5) {
+                do Output.printInt(Main.finish(j));
+                do Output.println();
+                do Main.loop();
+                return;
+            }
+        }
+        return;
+    }
+    function int finish(int x) {
+        if (x > 3) { return x * 2; } else { return x; }
+        return 99;
+    }
+    function void loop() {
+        var int k;
+        var String str;
+        let k = 0;
+        while (k < 3) {
+            let str = "abc";
+            do Output.printString(str);
+            do Output.printString("xyz");
+            let counter = counter + Main.sq(k) + Main.twice(k, 5);
+            let k = k + 1;
+        }
+        do Output.println();
+        do Output.printInt(counter);
+        do Output.println();
+        do Output.printInt(~(k = 3));
+        do Output.printInt(-(-k));
+        do Output.printInt(^k);
+        do Output.printInt(#(-7));
+        do Output.println();
+        do Output.printInt((k * 5) / -2);
+        do Output.printInt(k / 8);
+        do Output.printInt(1000 * k);
+        do Output.println();
+        return;
+    }
+    function int sq(int x) { return x * x; }
+    function int twice(int x, int y) { var int t; let t = x + y; return t + t; }
+}
+"""
+
+POINT = """
+class Point {
+    field int x, y;
+    constructor Point new(int ax, int ay) { let x = ax; let y = ay; return this; }
+    method int getX() { return x; }
+    method int getY() { return y; }
+    method void move(int dx, int dy) { let x = x + dx; let y = y + dy; return; }
+    method int dist2(Point other) {
+        var int dx, dy;
+        let dx = x - other.getX();
+        let dy = y - other.getY();
+        return (dx * dx) + (dy * dy);
+    }
+    method void pull(Point o) {
+        var int i;
+        while (i < 2) { do o.move(1, x); do move(o.getY(), 1); let i = i + 1; }
+        return;
+    }
+    method int acc(int n) {
+        var int s;
+        if (n > 0) { let s = s + n; }
+        let n = n + s;
+        return n;
+    }
+    method int twiceAcc() { return acc(3) + acc(4) + acc(x); }
+}
+"""
+
+# Calls for the inliner: methods on other receivers, arguments it assigns or
+# that are not in the caller's frame, nested calls and reused locals.
+INLINE = """
+class Main {
+    field int count, step;
+    static int calls;
+    constructor Main new(int s) { let step = s; let count = 0; return this; }
+    method int bump() {
+        let count = count + step;
+        let calls = calls + 1;
+        return count;
+    }
+    method int get() { return count; }
+    function int twice(int x) { let x = x + x; return x; }
+    function int sum(int a, int b) {
+        var int t;
+        let t = t + a;
+        let t = t + b;
+        return t;
+    }
+    function int first(Array a) { return a[0]; }
+    function int counted(int a) { let calls = calls + 1; return a; }
+    function void main() {
+        var Main m, n;
+        var Array a;
+        var int i;
+        let m = Main.new(3);
+        let n = Main.new(10);
+        do m.bump();
+        do Output.printInt(m.bump() + n.bump());
+        do Output.printChar(32);
+        let a = Array.new(1);
+        let a[0] = 5;
+        do Output.printInt(Main.sum(Main.twice(a[0]), Main.first(a)));
+        do Output.printChar(32);
+        do Output.printInt(Main.sum(1, 2) + Main.sum(3, 4));
+        do Output.printChar(32);
+        let i = 7;
+        do Output.printInt(Main.twice(i));
+        do Output.printChar(32);
+        do Output.printInt(i);
+        do Output.printChar(32);
+        do Output.printInt(Main.counted(calls));
+        do Output.printInt(calls);
+        do Output.printChar(32);
+        do Output.printInt(m.get() + n.get());
+        do Output.println();
+        return;
+    }
+}
+"""
+
+INLINED = ("Main.bump", "Main.get", "Main.twice", "Main.sum", "Main.first",
+           "Main.counted")
+
+# The builds every program is run with, besides the plain one.
+BUILDS = [{"optimizations": (name,)} for name in CompilationEngine.OPTIMIZATIONS] \
+    + [{"ast": True},
+       {"optimizations": CompilationEngine.OPTIMIZATIONS},
+       {"optimizations": CompilationEngine.OPTIMIZATIONS, "binary": True}]
+
+
+class OptimizationsTest(unittest.TestCase):
+
+    def check(self, sources, expected):
+        self.assertEqual(run(sources), expected)
+        for options in BUILDS:
+            with self.subTest(**options):
+                self.assertEqual(run(sources, **options), expected)
+
+    def test_conditions(self):
+        self.check({"Main": CONDITIONS}, "setcleareq663\n")
+
+    def test_arithmetic(self):
+        self.check({"Main": ARITHMETIC, "Point": POINT},
+                   "1494\n15\n128\n194\nyes12\nabcxyzabcxyzabcxyz\n41\n"
+                   "036-4\n-703000\n")
+
+
+class InlinerTest(unittest.TestCase):
+
+    def calls(self, **options):
+        """
+        Returns:
+            typing.Set[str]: the subroutines INLINE calls when compiled with
+            the inline optimization.
+        """
+        code = compile_source(INLINE, optimizations=("inline",), **options)
+        return {line.split()[1] for line in code.splitlines()
+                if line.startswith("call ")}
+
+    def test_runs_like_calls(self):
+        expected = "16 15 10 14 7 34 16\n"
+        self.assertEqual(run({"Main": INLINE}), expected)
+        for options in ({"optimizations": ("inline",)},
+                        {"optimizations": CompilationEngine.OPTIMIZATIONS}):
+            with self.subTest(**options):
+                self.assertEqual(run({"Main": INLINE}, **options), expected)
+
+    def test_inlines_leaves(self):
+        calls = self.calls()
+        self.assertIn("Main.new", calls)
+        self.assertFalse(calls.intersection(INLINED))
+
+    def test_threshold(self):
+        self.assertTrue(self.calls(inline_threshold=0).issuperset(INLINED))
+
+
+class PeepholeTest(unittest.TestCase):
+
+    def branch(self, condition):
+        return [("function", "Main.f", 0), ("push", "argument", 0)] \
+            + condition + [("if-goto", "T"), ("goto", "F"), ("label", "T"),
+                           ("push", "constant", 1), ("return",),
+                           ("label", "F"), ("push", "constant", 0),
+                           ("return",)]
+
+    def test_inverts_comparisons(self):
+        for condition in ([("push", "constant", 1), ("lt",)],
+                          [("push", "constant", 1), ("eq",), ("not",)]):
+            with self.subTest(condition=condition):
+                optimized = PeepholeOptimizer(None).optimize(
+                    self.branch(condition))
+                self.assertNotIn(("goto", "F"), optimized)
+                self.assertIn(("if-goto", "F"), optimized)
+
+    def test_keeps_other_conditions(self):
+        condition = [("push", "constant", 4), ("and",)]
+        optimized = PeepholeOptimizer(None).optimize(self.branch(condition))
+        self.assertIn(("if-goto", "T"), optimized)
+        self.assertIn(("goto", "F"), optimized)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import io
+import random
+import unittest
+from JackTokenizer import JackTokenizer
+
+
+SOURCE = """/** A class. */
+class Main {
+    // a line comment
+    function void main() {
+        var String s; /* a block
+        comment spanning lines */ var int x;
+        let s = "a // not a comment /* either */";
+        let x = 12 + (x * 3) / ~x;
+        return;
+    }
+}
+"""
+
+# Pieces of sources, joined at random with and without spaces.
+PIECES = ["let", "x", "=", "12", ";", "foo_bar", '"a b c"', '""', '"open',
+          "(", ")",
+          "+", "/", "*", " ", "\t", "/* c \" d */", "/**/", "/*/", "*/",
+          "/* a\n b */", "// x\n", "\n"]
+
+CHUNK_SIZES = (1, 2, 3, 7, 64, JackTokenizer.chunk_size)
+
+
+def values(tokens):
+    return [(token.kind, token.value) for token in tokens]
+
+
+def stream(source, chunk_size=JackTokenizer.chunk_size):
+    """
+    Args:
+        source (typing.Union[str, bytes]): a source, lexed from a text
+        stream if it is a str and in place if it is bytes.
+        chunk_size (int): the size of the chunks to lex.
+
+    Returns:
+        typing.List[typing.Tuple[str, typing.Any]]: the kind and value of
+        every token, as the parser gets them.
+    """
+    tokenizer = JackTokenizer(
+        source if isinstance(source, bytes) else io.StringIO(source))
+    tokenizer.chunk_size = chunk_size
+    tokens = []
+    while tokenizer.has_more_tokens():
+        tokenizer.advance()
+        tokens.append(tokenizer.current)
+    return values(tokens)
+
+
+def whole(source):
+    return values(JackTokenizer(io.StringIO("")).lex(source)[0])
+
+
+class StreamingTest(unittest.TestCase):
+
+    def check(self, source):
+        expected = whole(source)
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(stream(source, chunk_size), expected)
+                self.assertEqual(stream(source.encode(), chunk_size), expected)
+
+    def test_source(self):
+        self.check(SOURCE)
+
+    def test_single_line(self):
+        self.check(SOURCE.replace("// a line comment", "").replace("\n", " "))
+
+    def test_random_sources(self):
+        generator = random.Random(0)
+        for _ in range(200):
+            self.check("".join(
+                generator.choice(PIECES) + generator.choice(("", " "))
+                for _ in range(generator.randrange(1, 40))))
+
+    def test_unterminated_string(self):
+        self.assertEqual(whole('let s = "a b;\nlet t = "c";'),
+                         [("KEYWORD", "let"), ("IDENTIFIER", "s"),
+                          ("SYMBOL", "="), ("", '"a b;'), ("KEYWORD", "let"),
+                          ("IDENTIFIER", "t"), ("SYMBOL", "="),
+                          ("STRING_CONST", "c"), ("SYMBOL", ";")])
+
+    def test_unclosed_comment_ends_the_source(self):
+        for source in ("class A { } /* open", "class A { } // open"):
+            with self.subTest(source=source):
+                self.assertEqual(stream(source, 4), whole("class A { }"))
+
+
+class BoundedTest(unittest.TestCase):
+    """Lexing a long line or comment from a stream only ever lexes about a
+    chunk of text at a time.
+    """
+
+    def lexed_sizes(self, source):
+        tokenizer = JackTokenizer(io.StringIO(source))
+        sizes = []
+        for name in ("lex", "lex_line"):
+            def lex(text, method=getattr(tokenizer, name)):
+                sizes.append(len(text))
+                return method(text)
+            setattr(tokenizer, name, lex)
+        tokens = []
+        for chunk in tokenizer.chunks:
+            tokens.extend(chunk)
+        self.assertEqual(values(tokens), whole(source))
+        return sizes
+
+    def test_line_without_whitespace(self):
+        source = "class A { function void f() { do g(" + "x+1*" * 50000 \
+            + "x); return; } }"
+        self.assertLess(max(self.lexed_sizes(source)),
+                        2 * JackTokenizer.chunk_size)
+
+    def test_long_comments(self):
+        for source in ("class A { /*" + "x" * 100000 + "*/ }",
+                       "class A { /*" + "x y\n" * 25000 + "*/ }",
+                       "class A { } //" + "x" * 100000):
+            with self.subTest(source=source[:14]):
+                self.assertLess(max(self.lexed_sizes(source)),
+                                2 * JackTokenizer.chunk_size)
+
+
+if "__main__" == __name__:
+    unittest.main()